@@ -10,17 +10,20 @@ import matplotlib.dates as mdates
 from pathlib import Path
 from typing import Optional
 
+from graph_data import load_results_frame
+
 # Font settings (English)
 plt.rcParams['font.sans-serif'] = ['Arial', 'Helvetica', 'DejaVu Sans']
 plt.rcParams['font.family'] = 'sans-serif'
 plt.rcParams['axes.unicode_minus'] = False
 
-def generate_annual_pv_buy_demand_graph(results_dir: str = 'results', png_dir: str = 'png'):
+def generate_annual_pv_buy_demand_graph(results_dir: str = 'results', png_dir: str = 'png', df: Optional[pd.DataFrame] = None):
     """年間のPV発電・買電・需要の推移グラフを生成
 
     Args:
         results_dir: results ディレクトリまたはサブフォルダパス（workspace 相対）
         png_dir: png 出力ディレクトリまたはサブフォルダパス（workspace 相対）
+        df: 結果DataFrame（メモリ上）。指定時はCSVを読み直さない
     """
 
     # データ読み込み
@@ -30,8 +33,7 @@ def generate_annual_pv_buy_demand_graph(results_dir: str = 'results', png_dir: s
     output_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"データ読み込み中: {results_file}")
-    df = pd.read_csv(results_file)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = load_results_frame(results_file, df)
 
     # グラフ作成
     fig, ax = plt.subplots(figsize=(14, 6))
@@ -77,13 +79,15 @@ def generate_annual_pv_buy_demand_graph(results_dir: str = 'results', png_dir: s
 
     plt.close()
 
-def generate_annual_soc_graph(results_dir: str = 'results', png_dir: str = 'png', bF_max: Optional[int] = None):
+def generate_annual_soc_graph(results_dir: str = 'results', png_dir: str = 'png', bF_max: Optional[int] = None,
+                              df: Optional[pd.DataFrame] = None):
     """年間のSOC推移グラフを生成
 
     Args:
         results_dir: results ディレクトリまたはサブフォルダパス（workspace 相対）
         png_dir: png 出力ディレクトリまたはサブフォルダパス（workspace 相対）
         bF_max: 蓄電池容量（kWh） - グラフの目盛り等で使用
+        df: 結果DataFrame（メモリ上）。指定時はCSVを読み直さない
     """
 
     # データ読み込み
@@ -93,8 +97,7 @@ def generate_annual_soc_graph(results_dir: str = 'results', png_dir: str = 'png'
     output_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"\nデータ読み込み中: {results_file}")
-    df = pd.read_csv(results_file)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = load_results_frame(results_file, df)
 
     # グラフ作成
     fig, ax = plt.subplots(figsize=(14, 6))
@@ -116,10 +119,9 @@ def generate_annual_soc_graph(results_dir: str = 'results', png_dir: str = 'png'
     # bF_max を動的に決定（引数 > CSV列 > png_dir名 > デフォルト860）
     try:
         if bF_max is None:
-            # try to read from results CSV
-            sample = pd.read_csv(Path(base_dir) / Path(results_dir) / 'rolling_results.csv', nrows=1)
-            if 'bF_max' in sample.columns:
-                bF_max = int(sample['bF_max'].iloc[0])
+            # try to read from results data
+            if 'bF_max' in df.columns:
+                bF_max = int(df['bF_max'].iloc[0])
             else:
                 # infer from results_dir or png_dir name like socNNN
                 import re
@@ -161,35 +163,46 @@ def generate_annual_soc_graph(results_dir: str = 'results', png_dir: str = 'png'
 
     plt.close()
 
-if __name__ == '__main__':
-    import argparse
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--soc', type=str, default=None, help='SOCサブフォルダ名（例: soc860）')
-    parser.add_argument('--horizon', type=int, default=96, help='予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用')
-    args = parser.parse_args()
+def run(soc: Optional[str] = None, horizon: int = 96, df_res: Optional[pd.DataFrame] = None):
+    """年間グラフ一式を生成（rolling_opt.py からのインプロセス呼び出し用）
 
+    Args:
+        soc: SOCサブフォルダ名（例: soc860）
+        horizon: 予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用
+        df_res: 結果DataFrame（メモリ上）。指定時は rolling_results.csv を読み直さない
+    """
     # horizon=96 が基準、それ以外は h{horizon}/ サブフォルダを追加
-    if args.horizon == 96:
+    if horizon == 96:
         horizon_prefix = ''
     else:
-        horizon_prefix = f'h{args.horizon}/'
+        horizon_prefix = f'h{horizon}/'
 
-    if args.soc:
-        results_dir = f'results/{horizon_prefix}{args.soc}'
-        png_dir = f'png/{horizon_prefix}{args.soc}'
+    if soc:
+        results_dir = f'results/{horizon_prefix}{soc}'
+        png_dir = f'png/{horizon_prefix}{soc}'
     else:
         results_dir = f'results/{horizon_prefix}'.rstrip('/')
         png_dir = f'png/{horizon_prefix}'.rstrip('/')
 
-    # bF_max が環境やファイル名から決まる場合は引数で上書き可能
+    if df_res is None:
+        results_file = Path(__file__).parent.parent / Path(results_dir) / 'rolling_results.csv'
+        df_res = load_results_frame(results_file)
+    else:
+        df_res = load_results_frame(None, df_res)
+
+    # bF_max は rolling_results の bF_max 列があればそれを使う
     bF_max = None
-    try:
-        # results ディレクトリ内の rolling_results.csv に bF_max 情報がある場合に読み取る
-        sample = pd.read_csv(Path(__file__).parent.parent / Path(results_dir) / 'rolling_results.csv', nrows=1)
-        if 'bF_max' in sample.columns:
-            bF_max = int(sample['bF_max'].iloc[0])
-    except Exception:
-        bF_max = None
+    if 'bF_max' in df_res.columns:
+        bF_max = int(df_res['bF_max'].iloc[0])
+
+    generate_annual_pv_buy_demand_graph(results_dir=results_dir, png_dir=png_dir, df=df_res)
+    generate_annual_soc_graph(results_dir=results_dir, png_dir=png_dir, bF_max=bF_max, df=df_res)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--soc', type=str, default=None, help='SOCサブフォルダ名（例: soc860）')
+    parser.add_argument('--horizon', type=int, default=96, help='予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用')
+    args = parser.parse_args()
 
-    generate_annual_pv_buy_demand_graph(results_dir=results_dir, png_dir=png_dir)
-    generate_annual_soc_graph(results_dir=results_dir, png_dir=png_dir, bF_max=bF_max)
+    run(soc=args.soc, horizon=args.horizon)
@@ -12,11 +12,13 @@ import matplotlib.dates as mdates
 from datetime import datetime
 import os
 
+from graph_data import load_results_frame
+
 # 日本語フォントの設定
 plt.rcParams['font.sans-serif'] = ['Arial', 'Helvetica', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
-def generate_daily_pattern_graph(date1='2024-06-02', date2='2024-06-24', results_dir='results', png_dir='png'):
+def generate_daily_pattern_graph(date1='2024-06-02', date2='2024-06-24', results_dir='results', png_dir='png', df=None):
     """
     2つの日の運用パターンを比較したグラフを生成
     results_dir, png_dir: サブフォルダ対応（例: results/soc860, png/soc860）
@@ -31,6 +33,8 @@ def generate_daily_pattern_graph(date1='2024-06-02', date2='2024-06-24', results
         入力CSVのディレクトリ
     png_dir : str
         出力PNGのディレクトリ
+    df : pandas.DataFrame or None
+        結果DataFrame（メモリ上）。指定時はCSVを読み直さない
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
@@ -40,8 +44,7 @@ def generate_daily_pattern_graph(date1='2024-06-02', date2='2024-06-24', results
     print(f'\n=== 日次パターングラフ生成 ===')
     print(f'データ読み込み: {results_file}')
 
-    df = pd.read_csv(results_file)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = load_results_frame(results_file, df)
 
     # 2つの日のデータを抽出
     target_day1 = pd.to_datetime(date1)
@@ -179,6 +182,34 @@ def generate_daily_pattern_graph(date1='2024-06-02', date2='2024-06-24', results
 
     plt.close()
 
+def run(soc=None, horizon=96, df_res=None):
+    """
+    グラフを生成（rolling_opt.py からのインプロセス呼び出し用）
+
+    Parameters:
+    -----------
+    soc : str or None
+        SOCサブフォルダ名（例: soc860）
+    horizon : int
+        予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用
+    df_res : pandas.DataFrame or None
+        結果DataFrame（メモリ上）。指定時は rolling_results.csv を読み直さない
+    """
+    # horizon=96 が基準、それ以外は h{horizon}/ サブフォルダを追加
+    if horizon == 96:
+        horizon_prefix = ''
+    else:
+        horizon_prefix = f'h{horizon}/'
+
+    if soc:
+        results_dir = f'results/{horizon_prefix}{soc}'
+        png_dir = f'png/{horizon_prefix}{soc}'
+    else:
+        results_dir = f'results/{horizon_prefix}'.rstrip('/')
+        png_dir = f'png/{horizon_prefix}'.rstrip('/')
+
+    return generate_daily_pattern_graph('2024-06-02', '2024-06-24', results_dir=results_dir, png_dir=png_dir, df=df_res)
+
 if __name__ == '__main__':
     # 需要がほぼ同等(約2,450 kWh)でPV発電量が大きく異なる2日を比較
     # 2024-06-02: 需要2,436 kWh, PV発電1,433 kWh
@@ -189,18 +220,5 @@ if __name__ == '__main__':
     parser.add_argument('--horizon', type=int, default=96, help='予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用')
     args = parser.parse_args()
 
-    # horizon=96 が基準、それ以外は h{horizon}/ サブフォルダを追加
-    if args.horizon == 96:
-        horizon_prefix = ''
-    else:
-        horizon_prefix = f'h{args.horizon}/'
-
-    if args.soc:
-        results_dir = f'results/{horizon_prefix}{args.soc}'
-        png_dir = f'png/{horizon_prefix}{args.soc}'
-    else:
-        results_dir = f'results/{horizon_prefix}'.rstrip('/')
-        png_dir = f'png/{horizon_prefix}'.rstrip('/')
-
-    generate_daily_pattern_graph('2024-06-02', '2024-06-24', results_dir=results_dir, png_dir=png_dir)
+    run(soc=args.soc, horizon=args.horizon)
     print('\n完了しました!')
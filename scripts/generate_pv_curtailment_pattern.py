@@ -11,11 +11,13 @@ import matplotlib.dates as mdates
 from datetime import datetime
 import os
 
+from graph_data import load_results_frame
+
 # 日本語フォントの設定
 plt.rcParams['font.sans-serif'] = ['Arial', 'Helvetica', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
-def find_max_pv_surplus_day(results_file):
+def find_max_pv_surplus_day(results_file, df=None):
     """
     PV余剰が最大の日を見つける
 
@@ -23,14 +25,15 @@ def find_max_pv_surplus_day(results_file):
     -----------
     results_file : str
         結果CSVファイルのパス
+    df : pandas.DataFrame or None
+        結果DataFrame（メモリ上）。指定時はCSVを読み直さない
 
     Returns:
     --------
     str : 最大余剰日の日付 (YYYY-MM-DD形式)
     """
     print('\n=== PV余剰が最大の日を検索中... ===')
-    df = pd.read_csv(results_file)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = load_results_frame(results_file, df)
     df['date'] = df['timestamp'].dt.date
 
     # 日ごとのPV余剰合計を計算
@@ -52,7 +55,7 @@ def find_max_pv_surplus_day(results_file):
 
     return str(max_day['date'])
 
-def generate_pv_curtailment_pattern(target_date=None, results_dir='results', png_dir='png'):
+def generate_pv_curtailment_pattern(target_date=None, results_dir='results', png_dir='png', df=None):
     """
     PV余剰が発生している日のパターンを生成
     results_dir, png_dir: サブフォルダ対応（例: results/soc860, png/soc860）
@@ -65,21 +68,22 @@ def generate_pv_curtailment_pattern(target_date=None, results_dir='results', png
         入力CSVのディレクトリ
     png_dir : str
         出力PNGのディレクトリ
+    df : pandas.DataFrame or None
+        結果DataFrame（メモリ上）。指定時はCSVを読み直さない
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
     results_file = os.path.join(project_root, results_dir, 'rolling_results.csv')
     os.makedirs(os.path.join(project_root, png_dir), exist_ok=True)
 
-    # target_dateがNoneの場合、最大余剰日を自動検索
+    print(f'データ読み込み: {results_file}')
+    df = load_results_frame(results_file, df)
+
+    # target_dateがNoneの場合、最大余剰日を自動検索（読み込み済みのdfを再利用）
     if target_date is None:
-        target_date = find_max_pv_surplus_day(results_file)
+        target_date = find_max_pv_surplus_day(results_file, df=df)
 
     print(f'\n=== PV余剰パターングラフ生成 ({target_date}) ===')
-    print(f'データ読み込み: {results_file}')
-
-    df = pd.read_csv(results_file)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
 
     # 対象日のデータを抽出
     target_day = pd.to_datetime(target_date)
@@ -189,27 +193,41 @@ def generate_pv_curtailment_pattern(target_date=None, results_dir='results', png
 
     return target_date
 
-if __name__ == '__main__':
-    # 引数なしの場合は自動的に最大余剰日を選択
-    import argparse
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--soc', type=str, default=None, help='SOCサブフォルダ名（例: soc860）')
-    parser.add_argument('--horizon', type=int, default=96, help='予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用')
-    args = parser.parse_args()
+def run(soc=None, horizon=96, df_res=None):
+    """
+    グラフを生成（rolling_opt.py からのインプロセス呼び出し用）
 
+    Parameters:
+    -----------
+    soc : str or None
+        SOCサブフォルダ名（例: soc860）
+    horizon : int
+        予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用
+    df_res : pandas.DataFrame or None
+        結果DataFrame（メモリ上）。指定時は rolling_results.csv を読み直さない
+    """
     # horizon=96 が基準、それ以外は h{horizon}/ サブフォルダを追加
-    if args.horizon == 96:
+    if horizon == 96:
         horizon_prefix = ''
     else:
-        horizon_prefix = f'h{args.horizon}/'
+        horizon_prefix = f'h{horizon}/'
 
-    if args.soc:
-        results_dir = f'results/{horizon_prefix}{args.soc}'
-        png_dir = f'png/{horizon_prefix}{args.soc}'
+    if soc:
+        results_dir = f'results/{horizon_prefix}{soc}'
+        png_dir = f'png/{horizon_prefix}{soc}'
     else:
         results_dir = f'results/{horizon_prefix}'.rstrip('/')
         png_dir = f'png/{horizon_prefix}'.rstrip('/')
 
-    generate_pv_curtailment_pattern(results_dir=results_dir, png_dir=png_dir)
-    print('\n完了しました！')
+    return generate_pv_curtailment_pattern(results_dir=results_dir, png_dir=png_dir, df=df_res)
 
+if __name__ == '__main__':
+    # 引数なしの場合は自動的に最大余剰日を選択
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--soc', type=str, default=None, help='SOCサブフォルダ名（例: soc860）')
+    parser.add_argument('--horizon', type=int, default=96, help='予測期間（ステップ数）。96以外の場合はh{horizon}/サブフォルダを使用')
+    args = parser.parse_args()
+
+    run(soc=args.soc, horizon=args.horizon)
+    print('\n完了しました！')
@@ -15,6 +15,8 @@ matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.font_manager import FontProperties
+from matplotlib.transforms import offset_copy
 # try:
 #     import japanize_matplotlib
 # except ImportError:
@@ -26,6 +28,7 @@ plt.rcParams['font.sans-serif'] = ['Arial', 'Helvetica', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -46,6 +49,10 @@ def load_results(capacity: int, plan: str = "market_linked") -> pd.DataFrame:
         path = RESULTS_DIR / f"soc{capacity}" / "rolling_results.csv"
 
     df = pd.read_csv(path, parse_dates=['timestamp'])
+    # Downcast numeric columns; figures only show 1-2 decimal places.
+    # sBY and price stay float64: they feed annual energy-charge sums (_pareto_point)
+    float_cols = df.select_dtypes('float64').columns.drop(['sBY', 'price_yen_per_kWh'], errors='ignore')
+    df[float_cols] = df[float_cols].astype(np.float32)
     df['date'] = df['timestamp'].dt.date
     df['hour'] = df['timestamp'].dt.hour + df['timestamp'].dt.minute / 60
     df['month'] = df['timestamp'].dt.month
@@ -125,6 +132,31 @@ def create_heatmap_carpet_plot():
     print(f"  Saved: {OUTPUT_DIR / 'carpet_plot_soc_buy.png'}")
 
 
+def _pareto_point(capacity: int, plan: str):
+    """Load one result file and reduce it to a Pareto point (None if unavailable)"""
+    try:
+        df = load_results(capacity, plan)
+        max_buy = df['sBY'].max()
+
+        # Calculate Energy Charge
+        if plan == 'hokkaido_basic':
+            # Fixed price 30.56 JPY/kWh (approx) or actual calculation
+            # Using simple approximate calculation as in original script
+            energy_cost = df['sBY'].sum() * 0.5 * 30.56
+        else:
+            # Market linked
+            energy_cost = (df['sBY'] * df['price_yen_per_kWh'] * 0.5).sum()
+
+        return {
+            'capacity': capacity,
+            'max_buy': max_buy,
+            'energy_cost': energy_cost / 10000  # Convert to 10k JPY
+        }
+    except Exception as e:
+        print(f"  Warning: Could not load {plan} for capacity {capacity}: {e}")
+        return None
+
+
 def create_pareto_frontier():
     """
     Fig 2: Pareto Frontier
@@ -133,39 +165,29 @@ def create_pareto_frontier():
     print("Generating Pareto Frontier...")
 
     capacities = [0, 215, 430, 540, 645, 860, 1290, 1720]
+    plans = ['hokkaido_basic', 'market_linked']
 
     fig, ax = plt.subplots(figsize=(10, 8))
 
-    results = {'hokkaido_basic': [], 'market_linked': []}
-
-    for cap in capacities:
-        for plan in ['hokkaido_basic', 'market_linked']:
-            try:
-                df = load_results(cap, plan)
-                max_buy = df['sBY'].max()
-
-                # Calculate Energy Charge
-                if plan == 'hokkaido_basic':
-                    # Fixed price 30.56 JPY/kWh (approx) or actual calculation
-                    # Using simple approximate calculation as in original script
-                    energy_cost = df['sBY'].sum() * 0.5 * 30.56
-                else:
-                    # Market linked
-                    energy_cost = (df['sBY'] * df['price_yen_per_kWh'] * 0.5).sum()
-
-                results[plan].append({
-                    'capacity': cap,
-                    'max_buy': max_buy,
-                    'energy_cost': energy_cost / 10000  # Convert to 10k JPY
-                })
-            except Exception as e:
-                print(f"  Warning: Could not load {plan} for capacity {cap}: {e}")
+    # CSV loads are independent and I/O-bound, so read them concurrently
+    tasks = [(cap, plan) for cap in capacities for plan in plans]
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        points = list(ex.map(lambda cp: (cp, _pareto_point(*cp)), tasks))
+
+    results = {plan: [] for plan in plans}
+    for (cap, plan), point in points:
+        if point is not None:
+            results[plan].append(point)
 
     # Plot
     colors = {'hokkaido_basic': '#1f77b4', 'market_linked': '#ff7f0e'}
     labels = {'hokkaido_basic': 'Hokkaido Electric Basic', 'market_linked': 'Market-Linked Plan'}
     markers = {'hokkaido_basic': 'o', 'market_linked': 's'}
 
+    # Capacity labels share one font and one 5pt offset transform
+    label_font = FontProperties(size=8)
+    label_offset = offset_copy(ax.transData, fig=fig, x=5, y=5, units='points')
+
     for plan in ['hokkaido_basic', 'market_linked']:
         data = results[plan]
         if data:
@@ -179,8 +201,8 @@ def create_pareto_frontier():
 
             # Add capacity labels
             for xi, yi, cap in zip(x, y, caps):
-                ax.annotate(f'{cap}kWh', (xi, yi), textcoords="offset points",
-                           xytext=(5, 5), fontsize=8, alpha=0.8)
+                ax.text(xi, yi, f'{cap}kWh', transform=label_offset,
+                        fontproperties=label_font, alpha=0.8)
 
     ax.set_xlabel('Contract Power (Max Purchased) [kW]', fontsize=12)
     ax.set_ylabel('Energy Charge [10k JPY/Year]', fontsize=12)
@@ -252,7 +274,11 @@ def create_price_charge_scatter():
     # Define price bins
     price_bins = [0, 10, 15, 20, 25, 35]
     price_labels = ['0-10', '10-15', '15-20', '20-25', '25+']
-    df['price_bin'] = pd.cut(df['price_yen_per_kWh'], bins=price_bins, labels=price_labels)
+    # Right-closed bins like pd.cut; values outside (0, 35] get code -1 (NaN)
+    edges = np.asarray(price_bins, dtype=float)
+    codes = np.searchsorted(edges, df['price_yen_per_kWh'].to_numpy(), side='left') - 1
+    codes[(codes < 0) | (codes >= len(price_labels))] = -1
+    df['price_bin'] = pd.Categorical.from_codes(codes, categories=price_labels, ordered=True)
 
     # Charge by price bin
     charge_by_price = df.groupby('price_bin', observed=True)['xFC1'].agg(['mean', 'std', 'count'])
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+グラフ生成スクリプト（年間・日次・PV余剰パターン）共通の結果データ読み込み
+"""
+
+import pandas as pd
+
+
+def load_results_frame(results_file, df=None):
+    """rolling_results.csv を読み込む。df（timestamp列を持つ結果DataFrame）が渡された場合はCSVを読まずにそのコピーを使う"""
+    if df is None:
+        df = pd.read_csv(results_file)
+    else:
+        df = df.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
@@ -1,14 +1,46 @@
 #!/usr/bin/env python3
 """Generate graph showing relationship between battery capacity and contract power / annual cost."""
 
+import argparse
+from pathlib import Path
+
 import matplotlib.pyplot as plt
 import matplotlib
 import numpy as np
 
-# English font settings
-matplotlib.rcParams['font.family'] = 'sans-serif'
-matplotlib.rcParams['font.sans-serif'] = ['Arial', 'Helvetica', 'DejaVu Sans']
-matplotlib.rcParams['axes.unicode_minus'] = False
+# Font settings per language (English / Japanese)
+FONTS = {
+    'en': ['Arial', 'Helvetica', 'DejaVu Sans'],
+    'jp': ['Arial Unicode MS', 'Hiragino Sans', 'Yu Gothic', 'Meiryo', 'TakaoPGothic', 'IPAexGothic'],
+}
+
+# Labels / titles per language
+LABELS = {
+    'en': {
+        'hokkaido': 'Hokkaido Electric Basic Plan',
+        'market': 'Market-Linked Plan',
+        'capacity': 'Battery Capacity [kWh]',
+        'contract': 'Contract Power [kW]',
+        'contract_title': 'Relationship between Battery Capacity and Contract Power',
+        'purchase': 'Purchased Power [kWh]',
+        'purchase_title': 'Relationship between Battery Capacity and Purchased Power',
+        'cost': 'Annual Cost [×10,000 JPY]',
+        'cost_title': 'Relationship between Battery Capacity and Annual Cost',
+        'reversal': 'Advantage\nreversal',
+    },
+    'jp': {
+        'hokkaido': '北海道電力基本プラン',
+        'market': '市場価格連動プラン',
+        'capacity': '蓄電池容量 [kWh]',
+        'contract': '契約電力 [kW]',
+        'contract_title': '蓄電池容量と契約電力の関係',
+        'purchase': '買電量 [kWh]',
+        'purchase_title': '蓄電池容量と買電量の関係',
+        'cost': '年間電気料金 [万円]',
+        'cost_title': '蓄電池容量と年間電気料金の関係',
+        'reversal': '優劣の\n逆転',
+    },
+}
 
 # Data from JSON result files (annual_cost_comparison.json)
 capacity = [0, 215, 430, 540, 645, 860, 1290, 1720]
@@ -25,53 +57,72 @@ market_cost = [17422732, 14787091, 14613390, 14859816, 14858066, 15023532, 15125
 hokkaido_purchase = [590587, 551647, 535043, 532389, 531536, 531528, 531672, 531553]
 market_purchase = [590587, 552550, 535623, 532738, 531684, 531358, 531333, 531135]
 
-# Create graph (3-panel layout)
-fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8))
-
-# Panel 1: Contract power vs Battery capacity
-ax1.plot(capacity, hokkaido_contract, 'o-', color='#1f77b4', linewidth=2, markersize=8, label='Hokkaido Electric Basic Plan')
-ax1.plot(capacity, market_contract, 's-', color='#ff7f0e', linewidth=2, markersize=8, label='Market-Linked Plan')
-ax1.set_xlabel('Battery Capacity [kWh]', fontsize=12)
-ax1.set_ylabel('Contract Power [kW]', fontsize=12)
-ax1.set_title('Relationship between Battery Capacity and Contract Power', fontsize=14)
-ax1.legend(loc='upper right', fontsize=10)
-ax1.grid(True, alpha=0.3)
-ax1.set_xlim(-50, 1800)
-ax1.set_ylim(150, 280)
-
-# Panel 2: Purchased Power vs Battery capacity
-ax2.plot(capacity, hokkaido_purchase, 'o-', color='#1f77b4', linewidth=2, markersize=8, label='Hokkaido Electric Basic Plan')
-ax2.plot(capacity, market_purchase, 's-', color='#ff7f0e', linewidth=2, markersize=8, label='Market-Linked Plan')
-ax2.set_xlabel('Battery Capacity [kWh]', fontsize=12)
-ax2.set_ylabel('Purchased Power [kWh]', fontsize=12)
-ax2.set_title('Relationship between Battery Capacity and Purchased Power', fontsize=14)
-ax2.legend(loc='upper right', fontsize=10)
-ax2.grid(True, alpha=0.3)
-ax2.set_xlim(-50, 1800)
-# Dynamic ylim for clarity
-ax2.set_ylim(520000, 600000)
-
-# Panel 3: Annual cost vs Battery capacity
-hokkaido_cost_man = [c / 10000 for c in hokkaido_cost]  # in 万円 units
-market_cost_man = [c / 10000 for c in market_cost]
-
-ax3.plot(capacity, hokkaido_cost_man, 'o-', color='#1f77b4', linewidth=2, markersize=8, label='Hokkaido Electric Basic Plan')
-ax3.plot(capacity, market_cost_man, 's-', color='#ff7f0e', linewidth=2, markersize=8, label='Market-Linked Plan')
-ax3.set_xlabel('Battery Capacity [kWh]', fontsize=12)
-ax3.set_ylabel('Annual Cost [×10,000 JPY]', fontsize=12)
-ax3.set_title('Relationship between Battery Capacity and Annual Cost', fontsize=14)
-ax3.legend(loc='upper right', fontsize=10)
-ax3.grid(True, alpha=0.3)
-ax3.set_xlim(-50, 1800)
-
-# Mark crossover point on Cost graph (ax3)
-ax3.axvline(x=430, color='gray', linestyle='--', alpha=0.5)
-ax3.annotate('Advantage\nreversal', xy=(430, 1550), xytext=(550, 1650),
-             fontsize=9, ha='left',
-             arrowprops=dict(arrowstyle='->', color='gray'))
-
-plt.tight_layout()
-plt.savefig('/Users/yzhy/Documents/大学関係/2025前期/EMS/png/soc860/capacity_contract_power.png', dpi=150, bbox_inches='tight')
-plt.close()
-
-print("✓ Graph saved: png/soc860/capacity_contract_power.png")
+
+def plot_capacity_contract_power(lang='en'):
+    """Render the 3-panel capacity graph with labels in `lang` ('en' or 'jp')."""
+    labels = LABELS[lang]
+    matplotlib.rcParams['font.family'] = 'sans-serif'
+    matplotlib.rcParams['font.sans-serif'] = FONTS[lang]
+    matplotlib.rcParams['axes.unicode_minus'] = False
+
+    # Create graph (3-panel layout)
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8))
+
+    # Panel 1: Contract power vs Battery capacity
+    ax1.plot(capacity, hokkaido_contract, 'o-', color='#1f77b4', linewidth=2, markersize=8, label=labels['hokkaido'])
+    ax1.plot(capacity, market_contract, 's-', color='#ff7f0e', linewidth=2, markersize=8, label=labels['market'])
+    ax1.set_xlabel(labels['capacity'], fontsize=12)
+    ax1.set_ylabel(labels['contract'], fontsize=12)
+    ax1.set_title(labels['contract_title'], fontsize=14)
+    ax1.legend(loc='upper right', fontsize=10)
+    ax1.grid(True, alpha=0.3)
+    ax1.set_xlim(-50, 1800)
+    ax1.set_ylim(150, 280)
+
+    # Panel 2: Purchased Power vs Battery capacity
+    ax2.plot(capacity, hokkaido_purchase, 'o-', color='#1f77b4', linewidth=2, markersize=8, label=labels['hokkaido'])
+    ax2.plot(capacity, market_purchase, 's-', color='#ff7f0e', linewidth=2, markersize=8, label=labels['market'])
+    ax2.set_xlabel(labels['capacity'], fontsize=12)
+    ax2.set_ylabel(labels['purchase'], fontsize=12)
+    ax2.set_title(labels['purchase_title'], fontsize=14)
+    ax2.legend(loc='upper right', fontsize=10)
+    ax2.grid(True, alpha=0.3)
+    ax2.set_xlim(-50, 1800)
+    # Dynamic ylim for clarity
+    ax2.set_ylim(520000, 600000)
+
+    # Panel 3: Annual cost vs Battery capacity
+    hokkaido_cost_man = [c / 10000 for c in hokkaido_cost]  # in 万円 units
+    market_cost_man = [c / 10000 for c in market_cost]
+
+    ax3.plot(capacity, hokkaido_cost_man, 'o-', color='#1f77b4', linewidth=2, markersize=8, label=labels['hokkaido'])
+    ax3.plot(capacity, market_cost_man, 's-', color='#ff7f0e', linewidth=2, markersize=8, label=labels['market'])
+    ax3.set_xlabel(labels['capacity'], fontsize=12)
+    ax3.set_ylabel(labels['cost'], fontsize=12)
+    ax3.set_title(labels['cost_title'], fontsize=14)
+    ax3.legend(loc='upper right', fontsize=10)
+    ax3.grid(True, alpha=0.3)
+    ax3.set_xlim(-50, 1800)
+
+    # Mark crossover point on Cost graph (ax3)
+    ax3.axvline(x=430, color='gray', linestyle='--', alpha=0.5)
+    ax3.annotate(labels['reversal'], xy=(430, 1550), xytext=(550, 1650),
+                 fontsize=9, ha='left',
+                 arrowprops=dict(arrowstyle='->', color='gray'))
+
+    plt.tight_layout()
+    output_dir = Path(__file__).parent.parent / 'png' / 'soc860'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f'capacity_contract_power_{lang}.png'
+    plt.savefig(output_file, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+    print(f"✓ Graph saved: png/soc860/{output_file.name}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lang', choices=['en', 'jp'], default='en', help='Label language (en / jp)')
+    args = parser.parse_args()
+
+    plot_capacity_contract_power(args.lang)
@@ -1,17 +1,34 @@
 import argparse
+import importlib
+import io
+import json
 import os
+import re
+import shutil
+import time
 import unicodedata
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # ファイル出力のみ（GUI不要）
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from fpdf import FPDF
-from pyscipopt import Model
+from matplotlib.backends.backend_pdf import PdfPages
+from pyscipopt import Model, SCIP_PARAMSETTING
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 import logging
 import sys
+from pathlib import Path
 from typing import Optional
 
+# PNG出力の解像度（呼び出し側で rolling_opt.FIGURE_DPI を変更して上書き可能）
+FIGURE_DPI = 150
+# PNG圧縮設定: 中間生成物なので低圧縮で高速に書き出す（Pillowに渡される）
+PNG_PIL_KWARGS = {'compress_level': 3, 'optimize': False}
+# 長い折れ線を分割して描画（年間データでのAggレンダリング負荷を抑える）
+plt.rcParams['agg.path.chunksize'] = 10000
+
 
 def read_spot_price_data(path='spot_summary_2024.csv', path_2023='spot_summary_2023.csv'):
     """
@@ -21,29 +38,18 @@ def read_spot_price_data(path='spot_summary_2024.csv', path_2023='spot_summary_2
     - 2024年4~12月: spot_summary_2024.csv（2024年4~12月分）
     """
     def process_spot_data(df):
-        """スポット価格データを30分間隔に展開"""
-        expanded_data = []
-        for _, row in df.iterrows():
-            date_str = row['受渡日']
-            time_code = row['時刻コード']  # 1=00:00-01:00, 2=01:00-02:00, ..., 48=23:00-24:00
-            price = row['エリアプライス北海道(円/kWh)']
-
-            # 時刻コードから開始時刻を計算
-            if time_code <= 47:
-                start_hour = time_code - 1
-                base_date = pd.to_datetime(date_str)
-            else:
-                start_hour = 23
-                base_date = pd.to_datetime(date_str)
-
-            # 30分間隔で2つのデータポイントを作成（00分と30分）
-            for minute in [0, 30]:
-                timestamp = base_date + pd.Timedelta(hours=start_hour, minutes=minute)
-                expanded_data.append({
-                    'datetime': timestamp,
-                    'price_yen_per_kWh': price
-                })
-        return expanded_data
+        """スポット価格データを30分間隔に展開（1行 → 00分と30分の2行）"""
+        time_code = df['時刻コード'].to_numpy()  # 1=00:00-01:00, 2=01:00-02:00, ..., 48=23:00-24:00
+        # 時刻コードから開始時刻を計算（48は23時として扱う）
+        start_hour = np.where(time_code <= 47, time_code - 1, 23)
+        # 分単位の整数タイムライン上で計算（受渡日 + 開始時刻）
+        base = pd.to_datetime(df['受渡日'].to_numpy()).to_numpy().astype('datetime64[m]') + start_hour.astype('timedelta64[h]')
+
+        # 30分間隔で2つのデータポイントを作成（00分と30分）
+        minutes = base.repeat(2) + np.tile(np.array([0, 30], dtype='timedelta64[m]'), len(base))
+        timestamps = pd.DatetimeIndex(minutes.astype('datetime64[ns]'))
+        prices = np.repeat(df['エリアプライス北海道(円/kWh)'].to_numpy(), 2)
+        return pd.DataFrame({'datetime': timestamps, 'price_yen_per_kWh': prices})
 
     # 2024年度データを読み込み
     df_2024 = pd.read_csv(path, encoding='shift_jis')
@@ -54,52 +60,105 @@ def read_spot_price_data(path='spot_summary_2024.csv', path_2023='spot_summary_2
         df_2023 = pd.read_csv(path_2023, encoding='shift_jis')
         expanded_2023 = process_spot_data(df_2023)
         # 両方を結合
-        all_data = expanded_2023 + expanded_2024
+        price_df = pd.concat([expanded_2023, expanded_2024], ignore_index=True)
     except Exception as e:
         print(f'Warning: Could not load 2023 data ({e}), using 2024 data only')
-        all_data = expanded_2024
+        price_df = expanded_2024
 
-    price_df = pd.DataFrame(all_data)
-    # 重複を除去（同じ時刻の重複データがある場合）
-    price_df = price_df.drop_duplicates(subset=['datetime'])
-    price_df.set_index('datetime', inplace=True)
-    price_df.sort_index(inplace=True)
-    # インデックスの重複も除去（最初のものを保持）
-    price_df = price_df[~price_df.index.duplicated(keep='first')]
+    # 重複を除去（同じ時刻の重複データがある場合は先に読み込んだ方を保持）
+    # ソート前に一度だけ除去するので、インデックスは一意になる
+    price_df = price_df.drop_duplicates(subset=['datetime']).set_index('datetime').sort_index()
 
     return price_df
 
 
-def read_sample_excel(path, sheet_name='30分値'):
+def _align_market_prices(index, price_data, fuel_adjustment_rates, renewable_levy=3.98, warn_missing=True):
+    """
+    JEPX価格を需要データの時刻に合わせて一括取得し、再エネ賦課金を加算した買電単価[円/kWh]を返す
+
+    JEPX価格が存在しない時刻は北海道電力基本プランの料金（2024年料金 + 燃料費調整額）で補完する。
+    """
+    # マイクロ秒を削除して正規化（Excelデータに含まれる可能性があるため）
+    normalized_index = index.floor('s')
+    # 重複時刻は最初の値を使用
+    jepx_series = price_data['price_yen_per_kWh']
+    jepx_series = jepx_series[~jepx_series.index.duplicated(keep='first')]
+    jepx = jepx_series.reindex(normalized_index).to_numpy(dtype=float)
+
+    # 月 → 燃料費調整額の表（添字0は未使用）
+    energy_rate = 21.51  # 2024年料金
+    fuel_table = np.array([0.0] + [fuel_adjustment_rates.get(m, 0.0) for m in range(1, 13)])
+    fallback = energy_rate + np.take(fuel_table, index.month.to_numpy()) + renewable_levy
+    missing = np.isnan(jepx)
+    prices = np.where(missing, fallback, jepx + renewable_levy)
+    if warn_missing:
+        for i in np.flatnonzero(missing):
+            print(f'Warning: No JEPX price for {normalized_index[i]}, using fallback rate {prices[i]:.2f} yen/kWh')
+    return prices
+
+
+def _remap_year(index, year):
+    """DatetimeIndex の年を year に置き換える（時刻はそのまま、存在しない日付 = 2/29 は NaT）"""
+    dates = pd.to_datetime({'year': np.full(len(index), year), 'month': index.month, 'day': index.day}, errors='coerce')
+    return pd.DatetimeIndex(dates.to_numpy() + (index - index.normalize()).to_numpy())
+
+
+def _excel_cache_path(path, sheet_name):
+    # Excel読み込み結果のParquetキャッシュ（例: data/xxx.xlsx.30分値.parquet）
+    return f'{path}.{sheet_name}.parquet'
+
+
+def read_sample_excel(path, sheet_name='30分値', use_cache=True):
     path = unicodedata.normalize('NFC', path)
-    xls = pd.ExcelFile(path)
-    df = pd.read_excel(xls, sheet_name=sheet_name, header=0)
+    # Excelより新しいParquetキャッシュがあればそれを使う（openpyxlでの解析は遅いため）
+    cache_path = _excel_cache_path(path, sheet_name)
+    if use_cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f'Warning: could not read cache {cache_path} ({e}), reading Excel instead')
+
+    # python-calamine（Rust製）があれば使う。openpyxl（純Python）より大幅に速い
+    try:
+        import python_calamine  # noqa: F401
+        engine = 'calamine'
+    except ImportError:
+        engine = None
+    df = pd.read_excel(path, sheet_name=sheet_name, header=0, engine=engine)
     # Drop rows where 消費電力量 is non-numeric (unit row etc.)
     col = '消費電力量'
     if col not in df.columns:
         raise KeyError(f"Expected column '{col}' in sheet '{sheet_name}'")
     # Remove header/unit rows: keep rows where 消費電力量 can be converted to numeric
-    df = df[df[col].apply(lambda x: is_number(x))]
-    df = df.copy()
+    # (blank cells are kept as before; they become NaN)
+    numeric = pd.to_numeric(df[col], errors='coerce').notna()
+    df = df.loc[numeric | df[col].isnull()].copy()
+    df[col] = pd.to_numeric(df[col])
     # If 発電量 (PV) column exists, ensure numeric, otherwise fill with zeros
     pv_col = '発電量'
     if pv_col in df.columns:
-        df = df[df[pv_col].apply(lambda x: is_number(x)) | df[pv_col].isnull()]
-        df[pv_col] = pd.to_numeric(df[pv_col], errors='coerce').fillna(0.0)
+        pv = pd.to_numeric(df[pv_col], errors='coerce')
+        df = df.loc[pv.notna() | df[pv_col].isnull()]
+        df[pv_col] = pv.loc[df.index].fillna(0.0)
     else:
         # create PV column with zeros to simplify downstream logic
         df[pv_col] = 0.0
 
-    # Build datetime
-    df['datetime'] = pd.to_datetime(df['日付'].astype(str) + ' ' + df['時刻'].astype(str))
+    # Build datetime: 日付 gives the day, 時刻 the time of day
+    # (vectorized; avoids per-element dateutil parsing of the concatenated strings)
+    df['datetime'] = pd.to_datetime(df['日付']).dt.normalize() + pd.to_timedelta(df['時刻'].astype(str))
     df.set_index('datetime', inplace=True)
-    # Ensure numeric
-    df[col] = pd.to_numeric(df[col])
 
     # Excelの30分エネルギー[kWh] → 平均電力[kW]へ変換（Δt=0.5h なので×2）
     df['consumption_kW'] = df[col] * 2.0
     df['pv_kW'] = df[pv_col] * 2.0
 
+    if use_cache:
+        try:
+            df.to_parquet(cache_path)
+        except Exception as e:
+            print(f'Warning: could not write cache {cache_path}: {e}')
+
     return df
 
 
@@ -111,19 +170,18 @@ def is_number(x):
         return False
 
 
-def calculate_hokkaido_electricity_cost(energy_kWh_monthly, peak_demand_kW, month, year=2024, plan_type='hokkaido_basic'):
+def calculate_hokkaido_costs_by_month(monthly_energy_kWh, peak_demand_kW, year=2024, plan_type='hokkaido_basic'):
     """
-    北海道電力の電気料金を計算
+    北海道電力の電気料金を月別に一括計算
 
     Args:
-        energy_kWh_monthly: 月間電力使用量 (kWh)
-        peak_demand_kW: 月間最大需要電力 (kW) - 契約電力として使用
-        month: 月 (1-12)
+        monthly_energy_kWh: 月(1-12)をインデックスとする月間電力使用量 (kWh) のSeries
+        peak_demand_kW: 最大需要電力 (kW) - 契約電力として使用
         year: 年
         plan_type: 'hokkaido_basic' or 'market_linked'
 
     Returns:
-        dict with 'basic_charge', 'energy_charge', 'fuel_adjustment', 'renewable_levy', 'total'
+        DataFrame (index: 月) with 'basic_charge', 'energy_charge', 'fuel_adjustment', 'renewable_levy', 'total'
     """
     # 料金単価 (2024年4月1日実施 → 2025年10月1日実施)
     if year == 2024:
@@ -133,45 +191,119 @@ def calculate_hokkaido_electricity_cost(energy_kWh_monthly, peak_demand_kW, mont
         basic_rate_yen_per_kW = 2880.20  # 2025年10月1日実施
         energy_rate_yen_per_kWh = 21.62  # 2025年10月1日実施
 
-    # 基本料金: 契約電力(kW) × 料金単価(円/kW) × 0.85 × 12か月 / 12 (月割)
-    basic_charge = peak_demand_kW * basic_rate_yen_per_kW * 0.85
-
     # 燃料費調整額 (2024年の月別データ)
     fuel_adjustment_rates = {
         1: -8.76, 2: -8.59, 3: -8.56, 4: -8.85, 5: -9.02, 6: -7.47,
         7: -5.69, 8: -5.69, 9: -9.60, 10: -9.47, 11: -8.06, 12: -5.83
     }
-    fuel_adjustment_rate = fuel_adjustment_rates.get(month, 0.0)
+    energy = pd.Series(monthly_energy_kWh, dtype=float)
+    fuel_adjustment_rate = energy.index.map(fuel_adjustment_rates).to_series(index=energy.index).fillna(0.0).astype(float)
 
     # 再エネ賦課金
     renewable_levy_rate = 3.98  # 円/kWh
 
+    costs = pd.DataFrame(index=energy.index)
+    # 基本料金: 契約電力(kW) × 料金単価(円/kW) × 0.85 × 12か月 / 12 (月割)
+    costs['basic_charge'] = peak_demand_kW * basic_rate_yen_per_kW * 0.85
     if plan_type == 'hokkaido_basic':
         # 北海道電力基本プラン
-        energy_charge = energy_kWh_monthly * energy_rate_yen_per_kWh
-        fuel_adjustment = energy_kWh_monthly * fuel_adjustment_rate
-        renewable_levy = energy_kWh_monthly * renewable_levy_rate
+        costs['energy_charge'] = energy * energy_rate_yen_per_kWh
+        costs['fuel_adjustment'] = energy * fuel_adjustment_rate
     else:  # market_linked
         # 市場価格連動プランの場合、energy_chargeは別途JEPX価格で計算
-        energy_charge = 0.0  # 呼び出し元でJEPX価格を加算
-        fuel_adjustment = 0.0  # 市場価格連動では燃料費調整額なし
-        renewable_levy = energy_kWh_monthly * renewable_levy_rate
+        costs['energy_charge'] = 0.0  # 呼び出し元でJEPX価格を加算
+        costs['fuel_adjustment'] = 0.0  # 市場価格連動では燃料費調整額なし
+    costs['renewable_levy'] = energy * renewable_levy_rate
+    costs['total'] = costs['basic_charge'] + costs['energy_charge'] + costs['fuel_adjustment'] + costs['renewable_levy']
+    return costs
 
-    total = basic_charge + energy_charge + fuel_adjustment + renewable_levy
 
-    return {
-        'basic_charge': basic_charge,
-        'energy_charge': energy_charge,
-        'fuel_adjustment': fuel_adjustment,
-        'renewable_levy': renewable_levy,
-        'total': total
+def calculate_hokkaido_electricity_cost(energy_kWh_monthly, peak_demand_kW, month, year=2024, plan_type='hokkaido_basic'):
+    """
+    北海道電力の電気料金を計算（1か月分、calculate_hokkaido_costs_by_month の単月版）
+
+    Args:
+        energy_kWh_monthly: 月間電力使用量 (kWh)
+        peak_demand_kW: 月間最大需要電力 (kW) - 契約電力として使用
+        month: 月 (1-12)
+        year: 年
+        plan_type: 'hokkaido_basic' or 'market_linked'
+
+    Returns:
+        dict with 'basic_charge', 'energy_charge', 'fuel_adjustment', 'renewable_levy', 'total'
+    """
+    costs = calculate_hokkaido_costs_by_month(pd.Series([energy_kWh_monthly], index=[month]), peak_demand_kW, year, plan_type)
+    return {key: float(value) for key, value in costs.iloc[0].items()}
+
+
+def _initial_soc(bF0, params):
+    # ensure bF0 is numeric; fall back to params['bF0'] or half of capacity when missing
+    if isinstance(bF0, (int, float)):
+        return float(bF0)
+    param_bF0 = params.get('bF0', None)
+    if isinstance(param_bF0, (int, float)):
+        try:
+            return float(param_bF0)
+        except Exception:
+            pass
+    return float(params['bF_max'] * 0.5)
+
+
+def _horizon_prices(H, params, buy_prices=None):
+    # 時間別価格の設定（buy_pricesが指定されない場合は基本料金計算を含む）
+    if buy_prices is not None and len(buy_prices) == H:
+        # 市場価格連動プランまたは詳細な時間別価格が指定された場合
+        return buy_prices
+
+    # 北海道電力基本プランの場合、電力量料金のみを使用
+    # （基本料金は別途月間で計算）
+    year = params.get('year', 2024)
+    if year == 2024:
+        energy_rate = 21.51  # 2024年料金
+    else:
+        energy_rate = 21.62  # 2025年料金
+
+    # 月を取得（time indexが利用可能な場合）
+    month = params.get('month', 1)
+
+    # 燃料費調整額（2024年月別）
+    fuel_adjustment_rates = {
+        1: -8.76, 2: -8.59, 3: -8.56, 4: -8.85, 5: -9.02, 6: -7.47,
+        7: -5.69, 8: -5.69, 9: -9.60, 10: -9.47, 11: -8.06, 12: -5.83
     }
+    fuel_adjustment = fuel_adjustment_rates.get(month, 0.0)
 
+    # 再エネ賦課金
+    renewable_levy = 3.98
+
+    # 北海道電力基本プランの電力量料金
+    total_energy_rate = energy_rate + fuel_adjustment + renewable_levy
+    return [total_energy_rate] * H
+
+
+def _add_vars(model, prefix, H, named=False, lb=0, ub=None, vtype='C'):
+    # 変数名はデバッグ時のみ付与（通常は f-string の生成を省略し、SCIPに自動命名させる）
+    if named:
+        return [model.addVar(vtype=vtype, name=f'{prefix}_{k}', lb=lb, ub=ub) for k in range(H)]
+    return [model.addVar(vtype=vtype, lb=lb, ub=ub) for _ in range(H)]
+
+
+def build_horizon(H, params, time_limit: float = 60.0, skip_groups=None, debug=False, dt=None):
+    """
+    予測期間 H ステップ分の MILP を構築する（データ非依存部分のみ）
+
+    需要・PV・価格・初期SOCは update_and_solve() で毎回差し替えるため、
+    ローリング最適化では同じ H の間モデルを使い回せる。
+    debug=True のときのみ変数・制約に名前を付ける。
+    dt: 各ステップの時間幅[h]のリスト（省略時は全て0.5h）。予測期間後半を粗くする場合に使用。
+
+    Returns:
+        dict: 'model', 'H', 変数リスト ('sBY', 'bF', ...), 差し替え対象の制約
+    """
+    dt = tuple(float(h) for h in dt) if dt is not None else (0.5,) * H
+    if len(dt) != H:
+        raise ValueError(f'dt length {len(dt)} does not match horizon length {H}')
 
-def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: float = 60.0, debug=False, skip_groups=None, buy_prices=None):
-    # demand_kW: array-like length H
-    # buy_prices: array-like length H with prices for each time step (optional)
-    H = len(demand_kW)
     model = Model('rolling_horizon')
     # set time limit
     try:
@@ -181,99 +313,216 @@ def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: floa
             model.setParam('limits/time', time_limit)
         except Exception:
             pass
+    # 小規模MILPを何千回も解くため、前処理・ヒューリスティクスは軽量設定、切除平面は無効化
+    model.setPresolve(SCIP_PARAMSETTING.FAST)
+    model.setHeuristics(SCIP_PARAMSETTING.FAST)
+    model.setSeparating(SCIP_PARAMSETTING.OFF)
+    # ソルバーログの出力は debug 時のみ
+    if not debug:
+        model.hideOutput(True)
+    # 相対ギャップ上限（0 なら最適性証明まで解く）
+    mip_rel_gap = params.get('mip_rel_gap', 0.0)
+    if mip_rel_gap:
+        model.setRealParam('limits/gap', float(mip_rel_gap))
 
     M = 1e6
 
     # variables (mirror original structure)
-    sBY = {k: model.addVar(vtype='C', name=f'sBY_{k}', lb=0) for k in range(H)}
-    sSL = {k: model.addVar(vtype='C', name=f'sSL_{k}', lb=0) for k in range(H)}
+    sBY = _add_vars(model, 'sBY', H, named=debug)
+    sSL = _add_vars(model, 'sSL', H, named=debug)
 
-    # 契約電力変数（最大買電電力）
-    sBYMAX = model.addVar(vtype='C', name='sBYMAX', lb=0)
+    # 契約電力変数（最大買電電力）: 上限は買電上限パラメータ、下限は update_and_solve() で設定
+    sBYMAX = model.addVar(vtype='C', name='sBYMAX', lb=0, ub=params.get('sBYMAX', 1e6))
 
     # solar
-    # gP1: available (exogenous) PV generation for each time step (kW)
-    if pv_kW is None:
-        gP1 = {k: 0.0 for k in range(H)}
-    else:
-        # allow pv_kW to be list/array-like
-        gP1 = {k: float(pv_kW[k]) if k < len(pv_kW) else 0.0 for k in range(H)}
-    gP2 = {k: model.addVar(vtype='C', name=f'gP2_{k}', lb=0) for k in range(H)}
+    # gP2: PV actually used; bounded by the available generation gP1 set in update_and_solve()
+    gP2 = _add_vars(model, 'gP2', H, named=debug)
 
-    bF = {k: model.addVar(vtype='C', name=f'bF_{k}', lb=0) for k in range(H)}
-    xFC1 = {k: model.addVar(vtype='C', name=f'xFC1_{k}', lb=0) for k in range(H)}
-    xFC2 = {k: model.addVar(vtype='C', name=f'xFC2_{k}', lb=0) for k in range(H)}
-    xFD1 = {k: model.addVar(vtype='C', name=f'xFD1_{k}', lb=0) for k in range(H)}
-    xFD2 = {k: model.addVar(vtype='C', name=f'xFD2_{k}', lb=0) for k in range(H)}
+    bF_max = params.get('bF_max', 860)
+    has_battery = bF_max > 0
+    ks = range(H)
 
-    # 非同時充放電制約用の二値変数
-    # z[k] = 1: 充電可能, z[k] = 0: 放電可能
-    z = {k: model.addVar(vtype='B', name=f'z_charge_{k}') for k in range(H)}
+    # 蓄電池容量が0の場合: SOC・充放電変数を上限0で固定し、蓄電池関連の制約は一切追加しない
+    battery_ub = None if has_battery else 0.0
+    bF = _add_vars(model, 'bF', H, named=debug, ub=battery_ub)
+    xFC1 = _add_vars(model, 'xFC1', H, named=debug, ub=battery_ub)
+    xFC2 = _add_vars(model, 'xFC2', H, named=debug, ub=battery_ub)
+    xFD1 = _add_vars(model, 'xFD1', H, named=debug, ub=battery_ub)
+    xFD2 = _add_vars(model, 'xFD2', H, named=debug, ub=battery_ub)
 
-    # knowns
-    dA2 = demand_kW
+    # SOC容量制限（5%〜95%）
+    if has_battery:
+        soc_min = bF_max * 0.05
+        soc_max = bF_max * 0.95
+        model.addConss([c for k in ks for c in (bF[k] >= soc_min, bF[k] <= soc_max)])
 
-    # 時間別価格の設定（buy_pricesが指定されない場合は基本料金計算を含む）
-    if buy_prices is not None and len(buy_prices) == H:
-        # 市場価格連動プランまたは詳細な時間別価格が指定された場合
-        price_per_time = buy_prices
-    else:
-        # 北海道電力基本プランの場合、電力量料金のみを使用
-        # （基本料金は別途月間で計算）
-        year = params.get('year', 2024)
-        if year == 2024:
-            energy_rate = 21.51  # 2024年料金
-        else:
-            energy_rate = 21.62  # 2025年料金
+    # constraints (same equations as before, added one group at a time via addConss)
+    # demand / PV / initial SOC enter as right-hand sides and are set per solve
+    if skip_groups is None:
+        skip_groups = []
 
-        # 月を取得（time indexが利用可能な場合）
-        month = params.get('month', 1)
+    balance_cons = []
+    solar_cons = []
+    soc_init_cons = None
+
+    # electric balance: available PV (gP2) + sBY - sSL - xFC1 + xFD2 - dA2 == 0
+    if 'balance' not in skip_groups:
+        balance_cons = model.addConss([gP2[k] + sBY[k] - sSL[k] - xFC1[k] + xFD2[k] == 0 for k in ks])
+
+    # 契約電力制約: 各時刻の買電が契約電力以下
+    model.addConss([sBY[k] <= sBYMAX for k in ks])
+
+    # solar conversion inequality: gP2 <= gP1
+    # PV発電量をそのまま利用可能（過剰な場合は必要な分だけ使う）
+    if 'solar_conv' not in skip_groups:
+        solar_cons = model.addConss([gP2[k] <= 0 for k in ks])
+
+    # battery SOC update (with 0.5h time step)
+    # 蓄電池容量が0の場合はSOC更新制約をスキップ（既にbF=0に固定済み）
+    if 'soc_update' not in skip_groups and has_battery:
+        # 初期SOC制約 - k=0の場合のみ（右辺の初期SOCは毎回差し替え）
+        soc_init_cons = model.addCons(bF[0] - dt[0] * xFC2[0] + dt[0] * xFD1[0] == 0)
+        # bF[k] = bF[k-1] + xFC2[k] * dt[k] - xFD1[k] * dt[k]
+        # SOC更新: 前ステップのSOC + 充電エネルギー - 放電エネルギー
+        # xFC2, xFD1 は[kW]なので、ステップ幅 dt[k]（通常0.5h）をかけて[kWh]へ変換
+        model.addConss([bF[k] == bF[k - 1] + dt[k] * xFC2[k] - dt[k] * xFD1[k] for k in range(1, H)])
+
+    # battery bounds and charge/discharge limits
+    # 蓄電池容量が0の場合はスキップ（既に固定済み）
+    if 'battery_bounds' not in skip_groups and has_battery:
+        model.addConss([c for k in ks for c in (bF[k] <= bF_max, bF[k] >= 0.0)])  # バッテリー残量は非負
+    if 'charge_eq' not in skip_groups and has_battery:
+        alpha_FC = params.get('alpha_FC', 0.98)
+        alpha_FD = params.get('alpha_FD', 0.98)
+        model.addConss([c for k in ks for c in (xFC2[k] == alpha_FC * xFC1[k], xFD2[k] == alpha_FD * xFD1[k])])
+    if 'charge_limits' not in skip_groups and has_battery:
+        aFC = params.get('aFC', 400)
+        aFD = params.get('aFD', 400)
+        model.addConss([c for k in ks for c in (xFC2[k] <= aFC, xFD1[k] <= aFD)])
+
+    # 非同時充放電制約: 充電と放電を同時に行わない
+    # 蓄電池容量が0の場合はスキップ
+    if 'mutual_exclusion' not in skip_groups and has_battery:
+        # SOS1: xFC1[k], xFD1[k] のうち非ゼロになれるのは高々1つ（big-M + 二値変数より緩和が強い）
+        for k in ks:
+            if debug:
+                model.addConsSOS1([xFC1[k], xFD1[k]], name=f'sos_{k}')
+            else:
+                model.addConsSOS1([xFC1[k], xFD1[k]])
 
-        # 燃料費調整額（2024年月別）
-        fuel_adjustment_rates = {
-            1: -8.76, 2: -8.59, 3: -8.56, 4: -8.85, 5: -9.02, 6: -7.47,
-            7: -5.69, 8: -5.69, 9: -9.60, 10: -9.47, 11: -8.06, 12: -5.83
-        }
-        fuel_adjustment = fuel_adjustment_rates.get(month, 0.0)
+    # buy/sell constraints
+    if 'buy_sell' not in skip_groups:
+        # 売電制約: 逆潮流不可の場合は上限を0に設定
+        sell_max = params.get('sSLMAX', M)
+        model.addConss([sSL[k] <= sell_max for k in ks])
 
-        # 再エネ賦課金
-        renewable_levy = 3.98
+    return {
+        'model': model, 'H': H, 'dt': dt,
+        'sBY': sBY, 'sSL': sSL, 'sBYMAX': sBYMAX, 'gP2': gP2,
+        'bF': bF, 'xFC1': xFC1, 'xFC2': xFC2, 'xFD1': xFD1, 'xFD2': xFD2,
+        'balance_cons': balance_cons, 'solar_cons': solar_cons, 'soc_init_cons': soc_init_cons,
+        # 契約電力の下限（update_and_solve）は需給バランス・PV上限・充放電制約がすべて有る場合のみ有効
+        'sby_bound_valid': not any(g in skip_groups for g in ('balance', 'solar_conv', 'charge_eq', 'charge_limits')),
+        'last_res': None,
+    }
 
-        # 北海道電力基本プランの電力量料金
-        total_energy_rate = energy_rate + fuel_adjustment + renewable_levy
-        price_per_time = [total_energy_rate] * H
 
-    # objective - 基本料金と電力量料金の両方を考慮
-    # 基本料金: 契約電力 × 2829.60円/kW × 0.85 × 12ヶ月
-    # 電力量料金: 時間別価格 × 買電量 × 0.5時間
+def _add_shifted_warm_start(horizon, demand_kW, gP1, shift):
+    """前回の最適解を shift ステップ前にずらして初期解として登録（末尾は電池を使わない解で補完）"""
+    model = horizon['model']
+    H = horizon['H']
+    prev = horizon['last_res']
+    if prev is None or shift <= 0 or shift >= H:
+        return
+    # 時間幅が不均一（horizon_schedule使用時）はステップをずらしても対応しないため省略
+    if len(set(horizon['dt'])) > 1:
+        return
+
+    def shifted(key):
+        vals = list(prev[key][shift:])
+        return vals + [0.0] * (H - len(vals))
+
+    start = {key: shifted(key) for key in ['sBY', 'sSL', 'gP2', 'xFC1', 'xFC2', 'xFD1', 'xFD2', 'bF']}
+    for k in range(H - shift, H):
+        # 末尾の新しいステップ: PVを優先して使い、不足分を買電、SOCは据え置き
+        start['gP2'][k] = min(gP1[k], demand_kW[k])
+        start['sBY'][k] = max(0.0, demand_kW[k] - start['gP2'][k])
+        start['bF'][k] = start['bF'][k - 1]
+
+    sol = model.createSol()
+    for key, values in start.items():
+        for var, val in zip(horizon[key], values):
+            model.setSolVal(sol, var, val)
+    model.setSolVal(sol, horizon['sBYMAX'], max(start['sBY']))
+    model.addSol(sol, free=True)
+
+
+def update_and_solve(horizon, demand_kW, bF0, params, pv_kW=None, buy_prices=None, warm_start=True, shift=1, debug=False):
+    """
+    build_horizon() で構築したモデルに需要・PV・価格・初期SOCを設定して解く
 
-    # 基本料金の重み付け係数
-    # 1ヶ月の予測期間(H時刻)から年間への換算
-    basic_charge_rate = 2829.60 * 0.85  # 円/kW/月
-    # SOC容量制限（5%〜95%）
-    bF_max = params.get('bF_max', 860)
+    前回の解を warm start として渡すため、ローリング最適化では同じ horizon を使い回す。
+
+    Returns:
+        (res, status) - res は各変数の値のリスト、status はソルバーの状態
+    """
+    # demand_kW: array-like length H
+    # buy_prices: array-like length H with prices for each time step (optional)
+    model = horizon['model']
+    H = horizon['H']
+    if len(demand_kW) != H:
+        raise ValueError(f'demand length {len(demand_kW)} does not match horizon length {H}')
+
+    sBY, sSL, sBYMAX = horizon['sBY'], horizon['sSL'], horizon['sBYMAX']
+    gP2, bF = horizon['gP2'], horizon['bF']
+    xFC1, xFC2, xFD1, xFD2 = horizon['xFC1'], horizon['xFC2'], horizon['xFD1'], horizon['xFD2']
 
-    # 蓄電池容量が0の場合の特別処理
-    if bF_max <= 0:
-        # 蓄電池なし: SOC=0, 充放電=0に固定
-        for k in range(H):
-            model.addCons(bF[k] == 0)
-            model.addCons(xFC1[k] == 0)
-            model.addCons(xFC2[k] == 0)
-            model.addCons(xFD1[k] == 0)
-            model.addCons(xFD2[k] == 0)
-        soc_min = 0
-        soc_max = 0
+    # make sure the model is back in problem stage so data can be changed
+    model.freeTransform()
+
+    # knowns
+    dA2 = demand_kW
+    # gP1: available (exogenous) PV generation for each time step (kW)
+    if pv_kW is None:
+        gP1 = [0.0] * H
     else:
-        soc_min = bF_max * 0.05
-        soc_max = bF_max * 0.95
-        for k in range(H):
-            model.addCons(bF[k] >= soc_min)
-            model.addCons(bF[k] <= soc_max)
+        # allow pv_kW to be list/array-like (shorter input is padded with 0)
+        gP1 = np.zeros(H)
+        pv_arr = np.asarray(pv_kW, dtype=float)[:H]
+        gP1[:len(pv_arr)] = pv_arr
+
+    for k, cons in enumerate(horizon['balance_cons']):
+        model.chgLhs(cons, dA2[k])
+        model.chgRhs(cons, dA2[k])
+    for k, cons in enumerate(horizon['solar_cons']):
+        model.chgRhs(cons, gP1[k])
+    # undo a previous infeasibility relaxation on sBY
+    for v in sBY:
+        model.chgVarUb(v, model.infinity())
+
+    # 契約電力の下限: 最大出力で放電しても買電が必要な量（sBY[k] >= d - PV - alpha_FD*aFD）
+    # skip_groups で制約を外したデバッグ用モデルでは成り立たないので設定しない
+    if horizon.get('sby_bound_valid', True):
+        discharge_max = params.get('alpha_FD', 0.98) * params.get('aFD', 400) if params.get('bF_max', 860) > 0 else 0.0
+        min_buy = max(0.0, float(np.max(np.asarray(dA2, dtype=float) - gP1)) - discharge_max)
+        model.chgVarLb(sBYMAX, min(min_buy, params.get('sBYMAX', 1e6)))
+
+    bF0_val = _initial_soc(bF0, params)
+    if horizon['soc_init_cons'] is not None:
+        model.chgLhs(horizon['soc_init_cons'], bF0_val)
+        model.chgRhs(horizon['soc_init_cons'], bF0_val)
+
+    price_per_time = _horizon_prices(H, params, buy_prices)
+
+    # objective - 基本料金と電力量料金の両方を考慮
+    # 基本料金: 契約電力 × 2829.60円/kW × 0.85 × 12ヶ月
+    # 電力量料金: 時間別価格 × 買電量 × ステップ幅（通常0.5時間）
+
     # 基本料金の重み係数（仕様書どおりの按分係数）
     # w_basic = (2829.60 × 0.85 × 12 × (H × 0.5)) / (24 × 365)
-    # ここで H × 0.5 は予測期間の時間数
-    horizon_hours = H * 0.5  # 予測期間（時間）
+    # ここで H × 0.5（= dt の合計）は予測期間の時間数
+    dt = horizon['dt']
+    horizon_hours = sum(dt)  # 予測期間（時間）
     basic_charge_weight = (2829.60 * 0.85 * 12 * horizon_hours) / (24 * 365)
 
     # 売電価格: 逆潮流不可の場合は0円/kWh
@@ -281,86 +530,13 @@ def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: floa
     pSL = [sell_price] * H if isinstance(sell_price, (int, float)) else params.get('pSL', [0.0] * H)
 
     # 目的関数: 基本料金 + 電力量料金
-    # 30分間隔なので0.5をかけて時間単位に変換
+    # 30分間隔なので0.5（粗いステップはその時間幅）をかけて時間単位に変換
     model.setObjective(
         basic_charge_weight * sBYMAX +
-        sum(price_per_time[k] * sBY[k] * 0.5 - pSL[k] * sSL[k] * 0.5 for k in range(H)),
+        sum(price_per_time[k] * sBY[k] * dt[k] - pSL[k] * sSL[k] * dt[k] for k in range(H)),
         'minimize'
     )
 
-    # constraints (follow original ordering and equations)
-    if skip_groups is None:
-        skip_groups = []
-
-    for k in range(H):
-        # electric balance: available PV (gP2) + sBY - sSL - xFC1 + xFD2 - dA2 == 0
-        if 'balance' not in skip_groups:
-            model.addCons(gP2[k] + sBY[k] - sSL[k] - xFC1[k] + xFD2[k] - dA2[k] == 0)
-
-        # 契約電力制約: 各時刻の買電が契約電力以下
-        model.addCons(sBY[k] <= sBYMAX)
-
-        # solar conversion inequality: gP2 <= gP1
-        # PV発電量をそのまま利用可能（過剰な場合は必要な分だけ使う）
-        if 'solar_conv' not in skip_groups:
-            model.addCons(gP2[k] <= gP1[k])
-
-
-        # battery SOC update (with 0.5h time step)
-        # 蓄電池容量が0の場合はSOC更新制約をスキップ（既にbF=0に固定済み）
-        if 'soc_update' not in skip_groups and bF_max > 0:
-            if k > 0:
-                # bF[k] = bF[k-1] + xFC2[k] * 0.5 - xFD1[k] * 0.5
-                # SOC更新: 前ステップのSOC + 充電エネルギー - 放電エネルギー
-                # xFC2, xFD1 は[kW]なので、0.5h をかけて[kWh]へ変換
-                model.addCons(bF[k] == bF[k - 1] + 0.5 * xFC2[k] - 0.5 * xFD1[k])
-            else:
-                    # initial SOC
-                    # ensure bF0 is numeric; fall back to half of capacity when missing
-                    if not isinstance(bF0, (int, float)):
-                        param_bF0 = params.get('bF0', None)
-                        if isinstance(param_bF0, (int, float)):
-                            try:
-                                bF0_val = float(param_bF0)
-                            except Exception:
-                                bF0_val = float(params['bF_max'] * 0.5)
-                        else:
-                            bF0_val = float(params['bF_max'] * 0.5)
-                    else:
-                        bF0_val = float(bF0)
-                    # 初期SOC制約 - k=0の場合のみ
-                    if k == 0:
-                        model.addCons(bF[0] == bF0_val + 0.5 * xFC2[0] - 0.5 * xFD1[0])
-
-        # battery bounds and charge/discharge limits
-        # 蓄電池容量が0の場合はスキップ（既に固定済み）
-        if 'battery_bounds' not in skip_groups and bF_max > 0:
-            model.addCons(bF[k] <= params.get('bF_max', 860))
-            model.addCons(bF[k] >= 0.0)  # バッテリー残量は非負
-        if 'charge_eq' not in skip_groups and bF_max > 0:
-            model.addCons(xFC2[k] == params.get('alpha_FC', 0.98) * xFC1[k])
-            model.addCons(xFD2[k] == params.get('alpha_FD', 0.98) * xFD1[k])
-        if 'charge_limits' not in skip_groups and bF_max > 0:
-            model.addCons(xFC2[k] <= params.get('aFC', 400))
-            model.addCons(xFD1[k] <= params.get('aFD', 400))
-
-        # 非同時充放電制約: 充電と放電を同時に行わない
-        # 蓄電池容量が0の場合はスキップ
-        if 'mutual_exclusion' not in skip_groups and bF_max > 0:
-            # z[k] = 1 のとき充電可能、z[k] = 0 のとき放電可能
-            model.addCons(xFC1[k] <= M * z[k])
-            model.addCons(xFD1[k] <= M * (1 - z[k]))
-
-        # buy/sell constraints
-        if 'buy_sell' not in skip_groups:
-            # 売電制約: 逆潮流不可の場合は上限を0に設定
-            sell_max = params.get('sSLMAX', M)
-            model.addCons(sSL[k] <= sell_max)
-
-        # redundant bounds from original - skip duplicate bF_max constraint
-        if 'redundant_bounds' not in skip_groups:
-            pass  # bF bounds already handled above
-
     # If debugging, return the constructed model and variable dictionaries before optimizing
     if debug:
         return model, {
@@ -369,6 +545,12 @@ def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: floa
             'params': params, 'demand_kW': demand_kW
         }
 
+    if warm_start:
+        try:
+            _add_shifted_warm_start(horizon, dA2, gP1, shift)
+        except Exception as exc:
+            print(f'Warning: could not set warm start: {exc}')
+
     # optimize
     try:
         model.optimize()
@@ -377,15 +559,10 @@ def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: floa
         traceback.print_exc()
 
     # collect results
-    res = {k: [0.0] * H for k in ['sBY', 'sSL', 'xFC1', 'xFC2', 'xFD1', 'xFD2']}
+    # gP2 is included in results to report how much PV was used
+    res = {k: np.zeros(H) for k in ['sBY', 'sSL', 'xFC1', 'xFC2', 'xFD1', 'xFD2', 'gP2']}
     # Initialize bF with proper initial SOC value even for infeasible cases
-    if isinstance(bF0, (int, float)):
-        bF0_val = float(bF0)
-    else:
-        bF0_val = float(params.get('bF0', params['bF_max'] * 0.5))
-    res['bF'] = [bF0_val] * H  # Initialize with proper SOC value
-    # include gP2 in results to report how much PV was used
-    res['gP2'] = [0.0] * H
+    res['bF'] = np.full(H, bF0_val)  # Initialize with proper SOC value
     try:
         status = model.getStatus()
     except Exception as exc:
@@ -396,15 +573,9 @@ def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: floa
     if status == 'infeasible':
         try:
             new_ub = max(demand_kW) if len(demand_kW) > 0 else params.get('sBYMAX', 1e6)
-            for k in range(H):
-                try:
-                    model.chgVarUb(sBY[k], new_ub)
-                except Exception:
-                    # try alternate API
-                    try:
-                        sBY[k].setUb(new_ub)
-                    except Exception:
-                        pass
+            model.freeTransform()
+            for v in sBY:
+                model.chgVarUb(v, new_ub)
             # reoptimize
             model.optimize()
             try:
@@ -414,29 +585,68 @@ def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: floa
         except Exception:
             pass
 
-    if status == 'optimal':
+    # 'gaplimit': mip_rel_gap 以内の解で打ち切った場合も解として採用
+    if status in ('optimal', 'gaplimit'):
         try:
-            res['sBY'] = [model.getVal(sBY[k]) for k in range(H)]
-            res['sSL'] = [model.getVal(sSL[k]) for k in range(H)]
-            res['xFC1'] = [model.getVal(xFC1[k]) for k in range(H)]
-            res['xFC2'] = [model.getVal(xFC2[k]) for k in range(H)]
-            res['xFD1'] = [model.getVal(xFD1[k]) for k in range(H)]
-            res['xFD2'] = [model.getVal(xFD2[k]) for k in range(H)]
-            res['bF'] = [model.getVal(bF[k]) for k in range(H)]
-            res['gP2'] = [model.getVal(gP2[k]) for k in range(H)]
+            for key, variables in (('sBY', sBY), ('sSL', sSL), ('xFC1', xFC1), ('xFC2', xFC2),
+                                   ('xFD1', xFD1), ('xFD2', xFD2), ('bF', bF), ('gP2', gP2)):
+                res[key] = np.fromiter((model.getVal(v) for v in variables), dtype=float, count=H)
             res['sBYMAX'] = model.getVal(sBYMAX)  # 契約電力の値も記録
+            horizon['last_res'] = res
         except Exception as exc:
             print(f'Failed to extract optimal solution: {exc}')
-            pass
+            horizon['last_res'] = None
     else:
+        horizon['last_res'] = None
         # 最適解が見つからなかった場合はデバッグ情報を出力
-        if status != 'optimal':
-            print(f'Warning: Optimization status is {status}, not extracting solution values')
+        print(f'Warning: Optimization status is {status}, not extracting solution values')
+
+    # 解を取り出したら変換済み問題を解放（次回の更新に備え、SCIP内部状態を持ち越さない）
+    model.freeTransform()
 
     return res, status
 
 
-def run_rolling(df, horizon=96, control_horizon=1, time_limit: float = 60.0, max_steps=None, params=None, price_data=None):
+def build_and_solve_horizon(demand_kW, bF0, params, pv_kW=None, time_limit: float = 60.0, debug=False, skip_groups=None, buy_prices=None):
+    # 単発の最適化: モデルを構築して一度だけ解く（年間一括最適化・デバッグ用）
+    horizon = build_horizon(len(demand_kW), params, time_limit=time_limit, skip_groups=skip_groups, debug=debug)
+    return update_and_solve(horizon, demand_kW, bF0, params, pv_kW=pv_kW, buy_prices=buy_prices,
+                            warm_start=False, debug=debug)
+
+
+def _schedule_slot_sizes(schedule, control_horizon=1):
+    """
+    horizon_schedule [(スロット数, 時間幅[h]), ...] を、各スロットが含む30分ステップ数の配列に変換
+
+    例: [(24, 0.5), (12, 2.0)] → 最初の12時間は30分刻み、続く24時間は2時間刻み（計36スロット）
+    """
+    sizes = []
+    for num_slots, step_hours in schedule:
+        steps = int(round(step_hours / 0.5))
+        if steps < 1 or abs(steps * 0.5 - step_hours) > 1e-9:
+            raise ValueError(f'horizon_schedule step {step_hours}h must be a positive multiple of 0.5h')
+        sizes.extend([steps] * int(num_slots))
+    sizes = np.asarray(sizes, dtype=int)
+    # 実際に適用する先頭 control_horizon ステップは30分解像度である必要がある
+    if len(sizes) < control_horizon or np.any(sizes[:control_horizon] != 1):
+        raise ValueError('horizon_schedule must start with at least control_horizon 30-minute slots')
+    return sizes
+
+
+def _truncate_slots(sizes, remaining):
+    # データ末尾で残りステップ数に収まるようにスロットを切り詰める（最後のスロットは部分的に残す）
+    cum = np.cumsum(sizes)
+    keep = sizes[cum <= remaining]
+    covered = int(keep.sum())
+    if covered < remaining and len(keep) < len(sizes):
+        keep = np.append(keep, remaining - covered)
+    return keep
+
+
+def run_rolling(df, horizon=96, control_horizon=1, time_limit: float = 60.0, max_steps=None, params=None, price_data=None,
+                rebuild_every: int = 500):
+    # rebuild_every: 同じSCIPモデルを使い回す最大回数（長時間実行での性能劣化を避けるため定期的に作り直す）
+    # params['horizon_schedule'] を指定すると horizon の代わりに可変時間幅の予測期間を使う（_schedule_slot_sizes参照）
     if params is None:
         params = {}
     # provide defaults if missing
@@ -462,18 +672,17 @@ def run_rolling(df, horizon=96, control_horizon=1, time_limit: float = 60.0, max
 
     # Excelの30分エネルギー[kWh]は read_sample_excel() で平均電力[kW]へ変換済み
     # consumption_kW と pv_kW 列を使用
-    consumption_kW_all = df['consumption_kW'].values.tolist()
-    pv_kW_all = df['pv_kW'].values.tolist()
+    consumption_kW_all = df['consumption_kW'].to_numpy(dtype=float)
+    pv_kW_all = df['pv_kW'].to_numpy(dtype=float)
 
     # 実際の建物消費電力をそのまま使用（PVは最適化内で別途考慮される）
     demand_kW_all = consumption_kW_all
+    months_all = df.index.month.to_numpy()
 
     # 価格データの準備
     if price_data is not None:
         # 市場価格連動プラン: JEPX価格 + 再エネ賦課金
         renewable_levy = 3.98  # 円/kWh
-        # データフレームのインデックスに合わせて価格を取得
-        price_kW_all = []
 
         # 燃料費調整額（2024年月別）- フォールバック用
         fuel_adjustment_rates = {
@@ -481,25 +690,7 @@ def run_rolling(df, horizon=96, control_horizon=1, time_limit: float = 60.0, max
             7: -5.69, 8: -5.69, 9: -9.60, 10: -9.47, 11: -8.06, 12: -5.83
         }
 
-        for idx in df.index:
-            # マイクロ秒を削除して正規化（Excelデータに含まれる可能性があるため）
-            normalized_idx = idx.replace(microsecond=0)
-
-            # JEPX価格データから取得を試みる
-            if normalized_idx in price_data.index:
-                jepx_price = price_data.loc[normalized_idx, 'price_yen_per_kWh']
-                # Seriesが返された場合は最初の値を取得
-                if isinstance(jepx_price, pd.Series):
-                    jepx_price = jepx_price.iloc[0]
-                price_kW_all.append(float(jepx_price) + renewable_levy)
-            else:
-                # JEPX価格が存在しない場合は北海道電力基本プランの料金を使用（念のため）
-                month = idx.month
-                energy_rate = 21.51  # 2024年料金
-                fuel_adjustment = fuel_adjustment_rates.get(month, 0.0)
-                total_rate = energy_rate + fuel_adjustment + renewable_levy
-                price_kW_all.append(total_rate)
-                print(f'Warning: No JEPX price for {normalized_idx}, using fallback rate {total_rate:.2f} yen/kWh')
+        price_kW_all = _align_market_prices(df.index, price_data, fuel_adjustment_rates, renewable_levy)
     else:
         # 北海道電力基本プラン: 既に燃料費調整額と再エネ賦課金を含む
         price_kW_all = [params['buy_price']] * len(df)
@@ -514,23 +705,53 @@ def run_rolling(df, horizon=96, control_horizon=1, time_limit: float = 60.0, max
     except Exception:
         bF0 = float(params['bF_max'] * 0.5)
 
-    for t in range(0, min(N, max_steps), control_horizon):
-        H = min(horizon, N - t)
-        demand_segment = demand_kW_all[t:t + H]
-        pv_segment = pv_kW_all[t:t + H]
-        price_segment = price_kW_all[t:t + H] if price_data is not None else None
+    steps_total = min(N, max_steps)
+    buy_price = params['buy_price']
+
+    # 予測期間後半を粗い時間幅で扱う場合のスロット構成
+    schedule = params.get('horizon_schedule')
+    slot_sizes = _schedule_slot_sizes(schedule, control_horizon) if schedule else None
+
+    # 同じ予測期間構成の間はモデルを使い回し、前回解を warm start に使う
+    horizon_model = None
+    solves_on_model = 0
+
+    for t in range(0, steps_total, control_horizon):
+        if slot_sizes is None:
+            H = min(horizon, N - t)
+            dt = (0.5,) * H
+            demand_segment = demand_kW_all[t:t + H]
+            pv_segment = pv_kW_all[t:t + H]
+            price_segment = price_kW_all[t:t + H] if price_data is not None else None
+        else:
+            # 30分値をスロットごとに平均（需要・PVは平均電力[kW]、価格は平均単価）
+            sizes = _truncate_slots(slot_sizes, N - t)
+            starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            span = int(sizes.sum())
+            H = len(sizes)
+            dt = tuple(sizes * 0.5)
+            demand_segment = np.add.reduceat(demand_kW_all[t:t + span], starts) / sizes
+            pv_segment = np.add.reduceat(pv_kW_all[t:t + span], starts) / sizes
+            price_segment = np.add.reduceat(price_kW_all[t:t + span], starts) / sizes if price_data is not None else None
 
         # 現在の時刻に基づいて月を更新（北海道電力基本プランの場合）
         current_timestamp = df.index[t]
-        current_month = current_timestamp.month
-        params['month'] = current_month
+        params['month'] = int(months_all[t])
 
         # 進行状況表示（100ステップごと）
         if t % 100 == 0:
-            print(f'Progress: Step {t}/{min(N, max_steps)} ({t*100//min(N, max_steps)}%) - {current_timestamp}')
+            print(f'Progress: Step {t}/{steps_total} ({t*100//steps_total}%) - {current_timestamp}')
 
         try:
-            res, status = build_and_solve_horizon(demand_segment, bF0, params, pv_kW=pv_segment, time_limit=time_limit, buy_prices=price_segment)
+            # データ末尾で予測期間が短くなった場合はモデルを作り直す
+            if horizon_model is None or horizon_model['dt'] != dt or (rebuild_every and solves_on_model >= rebuild_every):
+                last_res = horizon_model['last_res'] if horizon_model is not None and horizon_model['dt'] == dt else None
+                horizon_model = build_horizon(H, params, time_limit=time_limit, dt=dt)
+                horizon_model['last_res'] = last_res  # 作り直しても warm start は継続
+                solves_on_model = 0
+            solves_on_model += 1
+            res, status = update_and_solve(horizon_model, demand_segment, bF0, params, pv_kW=pv_segment,
+                                           buy_prices=price_segment, shift=control_horizon)
         except Exception as e:
             print(f'Exception at rolling step t={t}:', e)
             traceback.print_exc()
@@ -539,22 +760,24 @@ def run_rolling(df, horizon=96, control_horizon=1, time_limit: float = 60.0, max
 
         # apply control_horizon steps of decisions
         steps_to_apply = min(control_horizon, len(res['sBY']))
+        # ステップ内で共通の値はループ外で一度だけ取得
+        gP2_res = res.get('gP2', [])
+        # 予測期間内での契約電力(sBYMAX)を記録
+        sBYMAX_horizon = res.get('sBYMAX', max(res['sBY']) if 'sBY' in res else 0.0)
+        status_str = str(status)
         for k in range(steps_to_apply):
-            if t + k >= min(N, max_steps):
+            if t + k >= steps_total:
                 break
             sBY_k = res['sBY'][k]
             sSL_k = res['sSL'][k]
             xFC1_k = res['xFC1'][k]
             xFD1_k = res['xFD1'][k]
             bF_k = res['bF'][k]
-            pv_used_k = res.get('gP2', [0.0] * (k+1))[k] if k < len(res.get('gP2', [])) else 0.0
+            pv_used_k = gP2_res[k] if k < len(gP2_res) else 0.0
             pv_surplus_k = max(0.0, pv_kW_all[t + k] - pv_used_k)
 
             timestamp = df.index[t + k]
-            current_price = price_kW_all[t + k] if price_data is not None else params['buy_price']
-
-            # 予測期間内での契約電力(sBYMAX)を記録
-            sBYMAX_horizon = res.get('sBYMAX', max(res['sBY']) if 'sBY' in res else 0.0)
+            current_price = price_kW_all[t + k] if price_data is not None else buy_price
 
             results_rows.append({
                 'timestamp': timestamp,
@@ -570,21 +793,57 @@ def run_rolling(df, horizon=96, control_horizon=1, time_limit: float = 60.0, max
                 'bF': bF_k,
                 'price_yen_per_kWh': current_price,
                 'sBYMAX_horizon': sBYMAX_horizon,  # 予測期間内の契約電力
-                'status': str(status)
+                'status': status_str
             })
 
         # update initial SOC for next iteration (use last applied step's SOC)
         bF0 = res['bF'][steps_to_apply - 1]
 
-    print(f'\nCompleted: {len(results_rows)} steps processed out of {min(N, max_steps)} requested')
+    print(f'\nCompleted: {len(results_rows)} steps processed out of {steps_total} requested')
 
     if len(results_rows) == 0:
         return pd.DataFrame()
     df_res = pd.DataFrame(results_rows)
     df_res.set_index('timestamp', inplace=True)
+    # ソルバー状態は数種類の文字列の繰り返しなのでカテゴリ型で保持（比較は整数コードで済む）
+    df_res['status'] = df_res['status'].astype('category')
     return df_res
 
 
+def _run_rolling_worker(task):
+    # ProcessPoolExecutor から呼ばれるため、モジュールレベルで定義（pickle可能にする）
+    df, params, kwargs = task
+    return run_rolling(df, params=params, **kwargs)
+
+
+def _run_rolling_timed(task):
+    # _run_rolling_worker と同じタスク形式で、計算時間 [秒] も返す（プロセス並列時も各プランの時間を記録するため）
+    start_time = time.time()
+    df_res = _run_rolling_worker(task)
+    return df_res, time.time() - start_time
+
+
+def run_rolling_sweep(df, param_list, max_workers=None, **kwargs):
+    """
+    複数のパラメータ設定（蓄電池容量の比較など）でローリング最適化を並列実行
+
+    各設定の時間方向の計算は run_rolling と同じく逐次（SOCを引き継ぐ）で、
+    設定ごとに別プロセスで解く。SCIPはこの規模では単一スレッドのため、プロセス並列で高速化する。
+
+    Args:
+        df: 入力データ（read_sample_excelで読み込んだDataFrame）
+        param_list: run_rolling に渡す params 辞書のリスト
+        max_workers: 最大プロセス数（None: CPUコア数）
+        **kwargs: run_rolling のその他の引数（horizon, control_horizon, time_limit, price_data など）
+
+    Returns:
+        list: param_list と同じ順序の結果DataFrameのリスト
+    """
+    tasks = [(df, dict(params), kwargs) for params in param_list]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_run_rolling_worker, tasks))
+
+
 def run_annual_optimal(df, time_limit: float = 3600.0, params=None, price_data=None):
     """
     年間一括最適化（パーフェクトフォーサイト）
@@ -601,7 +860,6 @@ def run_annual_optimal(df, time_limit: float = 3600.0, params=None, price_data=N
     Returns:
         DataFrame: 最適化結果（ローリング最適化と同じフォーマット）
     """
-    import time
 
     if params is None:
         params = {}
@@ -636,25 +894,12 @@ def run_annual_optimal(df, time_limit: float = 3600.0, params=None, price_data=N
     # 価格データの準備
     if price_data is not None:
         renewable_levy = 3.98
-        price_kW_all = []
         fuel_adjustment_rates = {
             1: -8.76, 2: -8.59, 3: -8.56, 4: -8.85, 5: -9.02, 6: -7.47,
             7: -5.69, 8: -5.69, 9: -9.60, 10: -9.47, 11: -8.06, 12: -5.83
         }
-
-        for idx in df.index:
-            normalized_idx = idx.replace(microsecond=0)
-            if normalized_idx in price_data.index:
-                jepx_price = price_data.loc[normalized_idx, 'price_yen_per_kWh']
-                if isinstance(jepx_price, pd.Series):
-                    jepx_price = jepx_price.iloc[0]
-                price_kW_all.append(float(jepx_price) + renewable_levy)
-            else:
-                month = idx.month
-                energy_rate = 21.51
-                fuel_adjustment = fuel_adjustment_rates.get(month, 0.0)
-                total_rate = energy_rate + fuel_adjustment + renewable_levy
-                price_kW_all.append(total_rate)
+        price_kW_all = _align_market_prices(df.index, price_data, fuel_adjustment_rates, renewable_levy,
+                                            warn_missing=False).tolist()
     else:
         price_kW_all = None
 
@@ -680,17 +925,21 @@ def run_annual_optimal(df, time_limit: float = 3600.0, params=None, price_data=N
     elapsed = time.time() - start_time
     print(f'最適化完了: {status} (計算時間: {elapsed:.1f}秒 = {elapsed/60:.1f}分)')
 
-    if status != 'optimal':
+    if status not in ('optimal', 'gaplimit'):
         print(f'警告: 最適解が見つかりませんでした (status={status})')
 
     # 結果をDataFrameに変換（ローリング最適化と同じフォーマット）
     results_rows = []
+    buy_price = params['buy_price']
+    gP2_res = res.get('gP2')
+    sBYMAX_annual = res.get('sBYMAX', 0.0)
+    status_str = str(status)
     for t in range(N):
         timestamp = df.index[t]
-        current_price = price_kW_all[t] if price_kW_all is not None else params['buy_price']
+        current_price = price_kW_all[t] if price_kW_all is not None else buy_price
 
         # PV余剰の計算
-        pv_used = res.get('gP2', [0.0] * N)[t] if 'gP2' in res else 0.0
+        pv_used = gP2_res[t] if gP2_res is not None else 0.0
         pv_surplus = max(0.0, pv_kW_all[t] - pv_used)
 
         results_rows.append({
@@ -706,12 +955,13 @@ def run_annual_optimal(df, time_limit: float = 3600.0, params=None, price_data=N
             'xFD1': res['xFD1'][t],
             'bF': res['bF'][t],
             'price_yen_per_kWh': current_price,
-            'sBYMAX_horizon': res.get('sBYMAX', 0.0),  # 年間全体の契約電力
-            'status': str(status)
+            'sBYMAX_horizon': sBYMAX_annual,  # 年間全体の契約電力
+            'status': status_str
         })
 
     df_res = pd.DataFrame(results_rows)
     df_res.set_index('timestamp', inplace=True)
+    df_res['status'] = df_res['status'].astype('category')
 
     print(f'年間一括最適化完了: {len(results_rows)}ステップ')
     print(f'  契約電力(最大買電): {res.get("sBYMAX", 0.0):.2f} kW')
@@ -720,81 +970,94 @@ def run_annual_optimal(df, time_limit: float = 3600.0, params=None, price_data=N
     return df_res
 
 
-def save_plots_and_pdf(df_res, out_prefix='rolling_results', png_dir='png'):
+def _save_png(fig, path, dpi=None):
+    # PNGをメモリ上に描画してからファイルへ書き出し、PDF作成時はそのバッファを再利用する
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi or FIGURE_DPI, pil_kwargs=PNG_PIL_KWARGS)
+    plt.close(fig)
+    with open(path, 'wb') as f:
+        f.write(buf.getvalue())
+    buf.seek(0)
+    return buf
+
+
+def save_plots_and_pdf(df_res, out_prefix='rolling_results', png_dir='png', want_pdf=False):
+    """結果グラフのPNGを保存し、want_pdf=True の場合のみまとめPDFも作成する。
+
+    Returns: (images, out_pdf)  ※PDFを作成しない場合 out_pdf は None
+    """
     os.makedirs(png_dir, exist_ok=True)
+    png_buffers = {}
+    # 年間結果（~17,520点）は1時間平均に間引いて描画（集計値は元データから計算）
+    plot_df = df_res
+    if len(df_res) >= 2000 and isinstance(df_res.index, pd.DatetimeIndex):
+        plot_df = df_res.select_dtypes(include='number').resample('h').mean()
+
     # 1) Time series: consumption, pv, pv_used, net demand
-    plt.figure(figsize=(12, 4))
-    ax = plt.gca()
-    if 'consumption_kW' in df_res.columns:
-        ax.plot(df_res.index, df_res['consumption_kW'], label='consumption_kW', color='tab:gray', linewidth=1)
-    if 'pv_kW' in df_res.columns:
-        ax.plot(df_res.index, df_res['pv_kW'], label='pv_kW', color='tab:orange', linewidth=1)
-    if 'pv_used_kW' in df_res.columns:
-        ax.plot(df_res.index, df_res['pv_used_kW'], label='pv_used_kW', color='tab:olive', linewidth=1)
-    if 'demand_kW' in df_res.columns:
-        ax.plot(df_res.index, df_res['demand_kW'], label='net_demand_kW', color='tab:red', linewidth=1)
+    fig, ax = plt.subplots(figsize=(12, 4))
+    if 'consumption_kW' in plot_df.columns:
+        ax.plot(plot_df.index, plot_df['consumption_kW'], label='consumption_kW', color='tab:gray', linewidth=1, rasterized=True)
+    if 'pv_kW' in plot_df.columns:
+        ax.plot(plot_df.index, plot_df['pv_kW'], label='pv_kW', color='tab:orange', linewidth=1, rasterized=True)
+    if 'pv_used_kW' in plot_df.columns:
+        ax.plot(plot_df.index, plot_df['pv_used_kW'], label='pv_used_kW', color='tab:olive', linewidth=1, rasterized=True)
+    if 'demand_kW' in plot_df.columns:
+        ax.plot(plot_df.index, plot_df['demand_kW'], label='net_demand_kW', color='tab:red', linewidth=1, rasterized=True)
     ax.set_ylabel('kW')
     ax.legend(ncol=3)
     ax.grid(alpha=0.3)
     p_timeseries = os.path.join(png_dir, f'{out_prefix}_timeseries.png')
-    plt.tight_layout()
-    plt.savefig(p_timeseries, dpi=200)
-    plt.close()
+    fig.tight_layout()
+    png_buffers[p_timeseries] = _save_png(fig, p_timeseries)
 
     # 2) Buy / Sell dedicated plot (sBY positive, sSL positive) stacked as separate lines
-    plt.figure(figsize=(12, 3))
-    ax = plt.gca()
-    if 'sBY' in df_res.columns:
-        ax.plot(df_res.index, df_res['sBY'], label='buy sBY (kW)', color='tab:blue')
-    if 'sSL' in df_res.columns:
-        ax.plot(df_res.index, df_res['sSL'], label='sell sSL (kW)', color='tab:green')
+    fig, ax = plt.subplots(figsize=(12, 3))
+    if 'sBY' in plot_df.columns:
+        ax.plot(plot_df.index, plot_df['sBY'], label='buy sBY (kW)', color='tab:blue', rasterized=True)
+    if 'sSL' in plot_df.columns:
+        ax.plot(plot_df.index, plot_df['sSL'], label='sell sSL (kW)', color='tab:green', rasterized=True)
     ax.set_ylabel('kW')
     ax.set_title('Grid buy/sell (per interval)')
     ax.legend()
     ax.grid(alpha=0.3)
     p_buysell = os.path.join(png_dir, f'{out_prefix}_buysell.png')
-    plt.tight_layout()
-    plt.savefig(p_buysell, dpi=200)
-    plt.close()
+    fig.tight_layout()
+    png_buffers[p_buysell] = _save_png(fig, p_buysell)
 
     # 3) Battery: SOC and charge/discharge (xFC1: charge, xFD1: discharge)
-    plt.figure(figsize=(12, 3))
-    ax = plt.gca()
-    if 'bF' in df_res.columns:
-        ax.plot(df_res.index, df_res['bF'], label='SOC bF (kWh)', color='tab:purple')
-    if 'xFC1' in df_res.columns:
-        ax.bar(df_res.index, df_res['xFC1'], width=0.02, label='charge xFC1 (kW)', color='tab:cyan', alpha=0.6)
-    if 'xFD1' in df_res.columns:
-        ax.bar(df_res.index, -df_res['xFD1'], width=0.02, label='discharge xFD1 (kW)', color='tab:orange', alpha=0.6)
+    fig, ax = plt.subplots(figsize=(12, 3))
+    if 'bF' in plot_df.columns:
+        ax.plot(plot_df.index, plot_df['bF'], label='SOC bF (kWh)', color='tab:purple', rasterized=True)
+    if 'xFC1' in plot_df.columns:
+        ax.bar(plot_df.index, plot_df['xFC1'], width=0.02, label='charge xFC1 (kW)', color='tab:cyan', alpha=0.6, rasterized=True)
+    if 'xFD1' in plot_df.columns:
+        ax.bar(plot_df.index, -plot_df['xFD1'], width=0.02, label='discharge xFD1 (kW)', color='tab:orange', alpha=0.6, rasterized=True)
     ax.set_ylabel('kW / kWh')
     ax.set_title('Battery SOC and charge/discharge (first-step)')
     ax.legend(ncol=2)
     ax.grid(alpha=0.3)
     p_battery = os.path.join(png_dir, f'{out_prefix}_battery.png')
-    plt.tight_layout()
-    plt.savefig(p_battery, dpi=200)
-    plt.close()
+    fig.tight_layout()
+    png_buffers[p_battery] = _save_png(fig, p_battery)
 
     # 4) PV stacked usage: pv_used vs pv_surplus (area) to visualise how PV is allocated
-    plt.figure(figsize=(12, 3))
-    ax = plt.gca()
-    if 'pv_used_kW' in df_res.columns:
-        used = df_res['pv_used_kW'].fillna(0.0)
+    fig, ax = plt.subplots(figsize=(12, 3))
+    if 'pv_used_kW' in plot_df.columns:
+        used = plot_df['pv_used_kW'].fillna(0.0)
     else:
-        used = pd.Series(0.0, index=df_res.index)
-    if 'pv_surplus_kW' in df_res.columns:
-        surplus = df_res['pv_surplus_kW'].fillna(0.0)
+        used = pd.Series(0.0, index=plot_df.index)
+    if 'pv_surplus_kW' in plot_df.columns:
+        surplus = plot_df['pv_surplus_kW'].fillna(0.0)
     else:
-        surplus = (df_res['pv_kW'].fillna(0.0) - used).clip(lower=0.0)
-    ax.stackplot(df_res.index, used, surplus, labels=['pv_used_kW', 'pv_surplus_kW'], colors=['tab:olive', 'tab:gray'], alpha=0.8)
+        surplus = (plot_df['pv_kW'].fillna(0.0) - used).clip(lower=0.0)
+    ax.stackplot(plot_df.index, used, surplus, labels=['pv_used_kW', 'pv_surplus_kW'], colors=['tab:olive', 'tab:gray'], alpha=0.8, rasterized=True)
     ax.set_ylabel('kW')
     ax.set_title('PV allocation: used vs surplus')
     ax.legend()
     ax.grid(alpha=0.2)
     p_pvstack = os.path.join(png_dir, f'{out_prefix}_pvstack.png')
-    plt.tight_layout()
-    plt.savefig(p_pvstack, dpi=200)
-    plt.close()
+    fig.tight_layout()
+    png_buffers[p_pvstack] = _save_png(fig, p_pvstack)
 
     # 5) Summary metrics as a small table figure
     total_intervals = len(df_res)
@@ -819,99 +1082,50 @@ def save_plots_and_pdf(df_res, out_prefix='rolling_results', png_dir='png'):
         f'batt discharged (xFD1): {total_batt_discharged_kwh:.2f} kWh',
     ]
 
-    plt.figure(figsize=(8, 3))
-    plt.axis('off')
-    plt.text(0.01, 0.99, 'Summary', fontsize=14, weight='bold', va='top')
+    fig, ax = plt.subplots(figsize=(8, 3))
+    ax.axis('off')
+    ax.text(0.01, 0.99, 'Summary', fontsize=14, weight='bold', va='top')
     for i, line in enumerate(summary_text):
-        plt.text(0.01, 0.9 - i * 0.13, line, fontsize=10, va='top')
+        ax.text(0.01, 0.9 - i * 0.13, line, fontsize=10, va='top')
     p_summary = os.path.join(png_dir, f'{out_prefix}_summary.png')
-    plt.tight_layout()
-    plt.savefig(p_summary, dpi=200)
-    plt.close()
+    fig.tight_layout()
+    png_buffers[p_summary] = _save_png(fig, p_summary)
 
     # make a PDF that includes all generated images in a 2-column grid per page
     images = [p_timeseries, p_buysell, p_battery, p_pvstack, p_summary]
-    pdf = FPDF(orientation='L', unit='mm', format='A4')  # landscape for better width
-    pdf.set_auto_page_break(True, margin=10)
-
-    # grid parameters (A4 landscape ~ 297 x 210 mm)
-    margin = 10
-    gap = 5
-    col_w = (297 - 2 * margin - gap) / 2
-    row_h = (210 - 2 * margin - gap) / 2
-
-    grid_imgs = images[:-1]  # leave last (summary) for its own page
-    for i in range(0, len(grid_imgs), 4):
-        page_imgs = grid_imgs[i:i+4]
-        pdf.add_page()
-        pdf.set_font('Arial', size=12)
-        pdf.cell(0, 8, 'Rolling Optimization Figures', ln=True, align='C')
-        # place up to 4 images in 2x2 grid
-        for j, img in enumerate(page_imgs):
-            row = j // 2
-            col = j % 2
-            x = margin + col * (col_w + gap)
-            # y offset: leave space for title (8+2 mm)
-            y = margin + 10 + row * (row_h + gap)
-            # fit image into cell preserving aspect (use width col_w)
-            try:
-                pdf.image(img, x=x, y=y, w=col_w)
-            except Exception:
-                # fallback: try smaller width
-                try:
-                    pdf.image(img, x=x, y=y, w=col_w * 0.9)
-                except Exception:
-                    pass
-
-    # add summary on its own page (portrait style effect)
-    pdf.add_page()
-    pdf.set_font('Arial', size=12)
-    pdf.cell(0, 8, 'Summary', ln=True, align='C')
-    try:
-        pdf.image(p_summary, x=20, y=25, w=257)  # fit landscape width
-    except Exception:
-        try:
-            pdf.image(p_summary, x=30, y=30, w=237)
-        except Exception:
-            pass
-
+    if not want_pdf:
+        return images, None
     out_pdf = f'{out_prefix}.pdf'
-    pdf.output(out_pdf)
-    return images, out_pdf
-
-
-def generate_monthly_figures(results_dir='results', png_dir='png', soc_label=None):
-    """
-    月別統計グラフを生成する関数
-    results_dir/rolling_results.csvから読み込んで、png_dir/ディレクトリにグラフを保存
-    results_dir, png_dir: サブフォルダ対応（例: results/soc860, png/soc860）
-    soc_label: サブフォルダ名（例: soc860）
-    """
-    import json
-    import os
+    a4_landscape = (297 / 25.4, 210 / 25.4)  # A4横 [inch]
+
+    with PdfPages(out_pdf) as pdf:
+        grid_imgs = images[:-1]  # leave last (summary) for its own page
+        for i in range(0, len(grid_imgs), 4):
+            page_imgs = grid_imgs[i:i+4]
+            fig, axes = plt.subplots(2, 2, figsize=a4_landscape)
+            fig.suptitle('Rolling Optimization Figures', fontsize=12)
+            # place up to 4 images in 2x2 grid (decoded from the in-memory PNGs)
+            for ax, img in zip(axes.flat, page_imgs + [None] * (4 - len(page_imgs))):
+                ax.axis('off')
+                if img is not None:
+                    ax.imshow(plt.imread(png_buffers[img]))
+            fig.tight_layout(rect=(0, 0, 1, 0.95))
+            pdf.savefig(fig, dpi=FIGURE_DPI)
+            plt.close(fig)
+
+        # add summary on its own page
+        fig, ax = plt.subplots(figsize=a4_landscape)
+        fig.suptitle('Summary', fontsize=12)
+        ax.axis('off')
+        ax.imshow(plt.imread(png_buffers[p_summary]))
+        pdf.savefig(fig, dpi=FIGURE_DPI)
+        plt.close(fig)
 
-    # データ読み込み
-    results_csv = os.path.join(results_dir, 'rolling_results.csv')
-    df = pd.read_csv(results_csv)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['month'] = pd.DatetimeIndex(df['timestamp']).month
-    df['pv_curtailed'] = df['pv_kW'] - df['pv_used_kW']
-
-    # 月別集計
-    monthly_stats = df.groupby('month').agg({
-        'consumption_kW': lambda x: (x * 0.5).sum(),  # kWh
-        'pv_kW': lambda x: (x * 0.5).sum(),  # kWh
-        'pv_used_kW': lambda x: (x * 0.5).sum(),  # kWh
-        'pv_curtailed': lambda x: (x * 0.5).sum(),  # kWh
-        'sBY': lambda x: (x * 0.5).sum(),  # kWh
-        'bF': 'mean'  # 平均SOC
-    }).round(2)
-
-    monthly_stats.columns = ['消費電力量', 'PV発電量', 'PV使用量', 'PV抑制量', '買電量', '平均SOC']
+    return images, out_pdf
 
-    # 最大買電電力（契約電力）も月別に集計
-    monthly_max_buy = df.groupby('month')['sBY'].max()
 
+def _render_monthly_statistics(monthly_stats, ts_sample, soc_sample, bF_max_local, out_path, dpi=None):
+    """月別エネルギー統計（2x2）の図を描画してPNG保存（プロセス並列で呼べるようモジュールレベルで定義）"""
     # 図の作成
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     fig.suptitle('月別エネルギー統計（2024年）', fontsize=16, fontweight='bold')
@@ -971,30 +1185,12 @@ def generate_monthly_figures(results_dir='results', png_dir='png', soc_label=Non
 
     # 4. 年間蓄電池SOC推移
     ax4 = axes[1, 1]
-
-    # 全データをプロット(サンプリングして表示を軽くする)
-    sample_rate = 48  # 1日1点(30分×48ステップ=24時間)
-    df_sample = df.iloc[::sample_rate].copy()
-
-    line1 = ax4.plot(df_sample['timestamp'], df_sample['bF'], linewidth=1.5, color='#4ECDC4', alpha=0.8)
+    line1 = ax4.plot(ts_sample, soc_sample, linewidth=1.5, color='#4ECDC4', alpha=0.8, rasterized=True)
 
     ax4.set_xlabel('月', fontsize=12)
     ax4.set_ylabel('蓄電池SOC (kWh)', fontsize=12)
     ax4.set_title('年間蓄電池SOC推移', fontsize=13, fontweight='bold')
     ax4.grid(True, alpha=0.3)
-    # bF_max を推定
-    try:
-        bF_max_local = 860
-        sample = pd.read_csv(os.path.join(results_dir, 'rolling_results.csv'), nrows=1)
-        if 'bF_max' in sample.columns:
-            bF_max_local = int(sample['bF_max'].iloc[0])
-        else:
-            import re
-            m = re.search(r'soc(\d+)', results_dir)
-            if m:
-                bF_max_local = int(m.group(1))
-    except Exception:
-        bF_max_local = 860
     ax4.set_ylim(0, bF_max_local * 1.05)
 
     # X軸を月表示に
@@ -1006,13 +1202,16 @@ def generate_monthly_figures(results_dir='results', png_dir='png', soc_label=Non
     ax4.axhline(y=bF_max_local, color='red', linestyle='--', linewidth=1, alpha=0.5, label=f'容量上限 ({bF_max_local}kWh)')
     ax4.legend(loc='upper right')
 
-    plt.tight_layout()
-    os.makedirs(png_dir, exist_ok=True)
-    out_monthly_stats = os.path.join(png_dir, 'monthly_statistics.png')
-    plt.savefig(out_monthly_stats, dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=dpi or FIGURE_DPI, pil_kwargs=PNG_PIL_KWARGS)
+    plt.close(fig)
+
+
+def _render_contract_power(monthly_max_buy, out_path, dpi=None):
+    """月別契約電力（最大買電電力）の図を描画してPNG保存（プロセス並列で呼べるようモジュールレベルで定義）"""
+    months = monthly_max_buy.index
+    month_labels = [f'{m}月' for m in months]
 
-    # 月別契約電力（最大買電電力）
     fig2, ax = plt.subplots(1, 1, figsize=(10, 6))
     bars = ax.bar(months, monthly_max_buy, color='#A23B72', alpha=0.8)
     ax.axhline(y=monthly_max_buy.max(), color='red', linestyle='--', linewidth=2,
@@ -1027,13 +1226,77 @@ def generate_monthly_figures(results_dir='results', png_dir='png', soc_label=Non
     ax.grid(True, alpha=0.3, axis='y')
 
     # 値をバーの上に表示
-    for i, (month, value) in enumerate(zip(months, monthly_max_buy)):
-        ax.text(month, value + 5, f'{value:.1f}', ha='center', va='bottom', fontsize=9)
+    ax.bar_label(bars, fmt='%.1f', padding=3, fontsize=9)
+
+    fig2.tight_layout()
+    fig2.savefig(out_path, dpi=dpi or FIGURE_DPI, pil_kwargs=PNG_PIL_KWARGS)
+    plt.close(fig2)
+
+
+def generate_monthly_figures(results_dir='results', png_dir='png', soc_label=None):
+    """
+    月別統計グラフを生成する関数
+    results_dir/rolling_results.csvから読み込んで、png_dir/ディレクトリにグラフを保存
+    results_dir, png_dir: サブフォルダ対応（例: results/soc860, png/soc860）
+    soc_label: サブフォルダ名（例: soc860）
+    """
+
+    # データ読み込み（使う列だけ。小数2桁に丸めて出力する電力量・SOCは float32 で保持して帯域を半減、
+    # 契約電力として丸めずに出力する sBY は float64 のまま）
+    results_csv = os.path.join(results_dir, 'rolling_results.csv')
+    float32_cols = ['consumption_kW', 'pv_kW', 'pv_used_kW', 'bF']
+    df = pd.read_csv(results_csv, usecols=['timestamp', 'sBY', *float32_cols],
+                     dtype={c: 'float32' for c in float32_cols})
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['month'] = pd.DatetimeIndex(df['timestamp']).month
+    df['pv_curtailed'] = df['pv_kW'] - df['pv_used_kW']
+
+    # 月別集計（グループ化は1回、合計は float64 で累積してから kWh に換算）
+    grouped = df.groupby('month')
+    energy_cols = ['consumption_kW', 'pv_kW', 'pv_used_kW', 'pv_curtailed', 'sBY']
+    monthly_stats = (grouped[energy_cols].sum().astype('float64') * 0.5)  # kWh
+    monthly_stats['bF'] = grouped['bF'].mean().astype('float64')  # 平均SOC
+    monthly_stats = monthly_stats.round(2)
+
+    monthly_stats.columns = ['消費電力量', 'PV発電量', 'PV使用量', 'PV抑制量', '買電量', '平均SOC']
+
+    # 最大買電電力（契約電力）も月別に集計
+    monthly_max_buy = grouped['sBY'].max()
+
+    # 年間SOC推移はサンプリングして表示を軽くする
+    sample_rate = 48  # 1日1点(30分×48ステップ=24時間)
+    # 描画に使う2列だけをビューで間引く（全列のコピーを作らない）
+    ts_sample = df['timestamp'].to_numpy()[::sample_rate]
+    soc_sample = df['bF'].to_numpy()[::sample_rate]
+
+    # bF_max を推定
+    try:
+        bF_max_local = 860
+        sample = pd.read_csv(os.path.join(results_dir, 'rolling_results.csv'), nrows=1)
+        if 'bF_max' in sample.columns:
+            bF_max_local = int(sample['bF_max'].iloc[0])
+        else:
+            m = re.search(r'soc(\d+)', results_dir)
+            if m:
+                bF_max_local = int(m.group(1))
+    except Exception:
+        bF_max_local = 860
 
-    plt.tight_layout()
+    # 2つの図は互いに独立なので、2コア以上あれば別プロセスで同時に描画する
+    os.makedirs(png_dir, exist_ok=True)
+    out_monthly_stats = os.path.join(png_dir, 'monthly_statistics.png')
     out_contract_power = os.path.join(png_dir, 'monthly_contract_power.png')
-    plt.savefig(out_contract_power, dpi=300, bbox_inches='tight')
-    plt.close()
+    stats_args = (monthly_stats, ts_sample, soc_sample, bF_max_local, out_monthly_stats, FIGURE_DPI)
+    contract_args = (monthly_max_buy, out_contract_power, FIGURE_DPI)
+    if (os.cpu_count() or 1) >= 2:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(_render_monthly_statistics, *stats_args),
+                       executor.submit(_render_contract_power, *contract_args)]
+            for future in futures:
+                future.result()
+    else:
+        _render_monthly_statistics(*stats_args)
+        _render_contract_power(*contract_args)
 
     # 月別統計をCSVに保存
     monthly_stats['最大買電電力'] = monthly_max_buy
@@ -1068,7 +1331,9 @@ def main():
     parser.add_argument('--horizon', type=int, default=96)  # 48時間先まで予測（96ステップ）
     parser.add_argument('--control_horizon', type=int, default=1, help='制御ホライズン [ステップ] - 何ステップごとに計画を更新するか（1=30分ごと、4=2時間ごと）')
     parser.add_argument('--time_limit', type=float, default=10.0)
+    parser.add_argument('--mip_rel_gap', type=float, default=None, help='MIP相対ギャップ上限（例: 0.01 = 1%%で打ち切り、既定は0=最適解）')
     parser.add_argument('--max_steps', type=int, default=None)
+    parser.add_argument('--pdf', action='store_true', help='グラフをまとめたPDF (rolling_results.pdf) も作成する')
     parser.add_argument('--price_data', default='data/spot_summary_2024.csv', help='JEPX spot price data file (2024年度)')
     parser.add_argument('--price_data_2023', default='data/spot_summary_2023.csv', help='JEPX spot price data file (2023年度、2024年1-3月用)')
     parser.add_argument('--use_fixed_price', action='store_true', help='Use fixed price (北海道電力基本プラン) instead of market price (市場価格連動プラン)')
@@ -1088,19 +1353,22 @@ def main():
 
     # 検証モードの実行 (最適化を実行せずに終了)
     if args.validate or args.verify_dates or args.find_representative:
+        # CSVは1回だけ読み込み、各検証関数で共有する
+        # （3つの検証が参照する列はいずれも VALIDATION_COLUMNS に含まれるので、その列だけを読む）
+        df_csv = _load_results(args.csv, columns=VALIDATION_COLUMNS) if Path(args.csv).exists() else None
+
         if args.validate:
             print("データ検証を実行中...")
-            validate_results(csv_path=args.csv, output_report=True)
+            validate_results(csv_path=args.csv, output_report=True, df=df_csv)
 
         if args.verify_dates:
             print(f"\n特定日付を検証中: {', '.join(args.verify_dates)}")
-            verify_specific_dates(csv_path=args.csv, dates_to_check=args.verify_dates)
+            verify_specific_dates(csv_path=args.csv, dates_to_check=args.verify_dates, df=df_csv)
 
         if args.find_representative:
             print("\n代表日を検索中...")
-            find_representative_day(csv_path=args.csv)
+            find_representative_day(csv_path=args.csv, df=df_csv)
 
-        import sys
         sys.exit(0)
 
     params = {
@@ -1117,9 +1385,12 @@ def main():
         'sBYMAX': 1e6,           # 買電上限: 実質無制限
         'sSLMAX': 0.0,           # 売電上限: 0kW (逆潮流不可)
         'year': 2024,            # データ年: 2024年
+        'mip_rel_gap': 0.0,      # MIP相対ギャップ上限 (0=最適性証明まで)
     }
 
     # apply CLI overrides
+    if args.mip_rel_gap is not None:
+        params['mip_rel_gap'] = args.mip_rel_gap
     if args.bF_max is not None:
         try:
             params['bF_max'] = float(args.bF_max)
@@ -1132,13 +1403,7 @@ def main():
     df = read_sample_excel(args.excel, sheet_name=args.sheet)
 
     # 2025年データを2024年として扱う（2/29を除外）
-    def remap_year(ts):
-        try:
-            return ts.replace(year=2024)
-        except ValueError:  # 2/29の場合
-            return pd.NaT
-
-    df.index = df.index.map(remap_year)
+    df.index = _remap_year(df.index, 2024)
     df = df[df.index.notna()]  # NaTを削除
 
     print('Rows:', len(df))
@@ -1164,7 +1429,6 @@ def main():
     # ========================================
     # モード分岐: 年間一括最適化 or ローリング最適化
     # ========================================
-    import time
     total_start_time = time.time()
     timing_info = {}
 
@@ -1197,7 +1461,9 @@ def main():
         df_res_hokkaido.to_csv(out_csv_hokkaido)
         print(f'✓ Saved {out_csv_hokkaido}')
 
-        hokkaido_costs = calculate_single_plan_costs(df_res_hokkaido, None, 'hokkaido_basic')
+        # 月番号は1回だけ計算し、市場連動プランの結果が同じindexの場合のみ使い回す
+        months_idx = df_res_hokkaido.index.month.to_numpy()
+        hokkaido_costs = calculate_single_plan_costs(df_res_hokkaido, None, 'hokkaido_basic', months=months_idx)
 
         # 市場価格連動プランで年間一括最適化
         market_costs = None
@@ -1212,29 +1478,48 @@ def main():
             df_res_market.to_csv(out_csv_market)
             print(f'✓ Saved {out_csv_market}')
 
-            market_costs = calculate_single_plan_costs(df_res_market, price_data, 'market_linked')
+            # ソルバー例外で途中終了した場合など、行数が異なれば index から計算し直す
+            market_months = months_idx if df_res_market.index.equals(df_res_hokkaido.index) else None
+            market_costs = calculate_single_plan_costs(df_res_market, price_data, 'market_linked', months=market_months)
             df_res = df_res_market
+            src_csv = out_csv_market
         else:
             df_res = df_res_hokkaido
+            src_csv = out_csv_hokkaido
 
-        # メイン結果CSVを保存
+        # メイン結果CSVを保存（内容は直前に書いたプラン別CSVと同一なので再シリアライズせずコピー）
         out_csv_main = os.path.join(results_dir, 'annual_results.csv')
-        df_res.to_csv(out_csv_main)
+        shutil.copyfile(src_csv, out_csv_main)
         print(f'\n✓ Saved {out_csv_main} (メイン結果)')
 
     else:
         # ========================================
         # ローリング最適化モード（デフォルト）
         # ========================================
-        print('\n' + '='*70)
-        print('1️⃣  北海道電力基本プランで最適化実行中...')
-        print('='*70)
-        print('プラン: 北海道電力基本プラン (電力量料金+燃料費調整額+再エネ賦課金)')
+        rolling_kwargs = dict(horizon=args.horizon, control_horizon=args.control_horizon, time_limit=args.time_limit,
+                              max_steps=args.max_steps)
+        run_market = not args.use_fixed_price and price_data is not None
+        # 両プランの最適化は独立なので、2コア以上あれば別プロセスで同時に解く
+        # （1コアでは時間制限付きの各ステップがCPUを取り合い結果が変わり得るため逐次実行）
+        parallel_plans = run_market and (os.cpu_count() or 1) >= 2
+        df_res_market = None
+
+        if parallel_plans:
+            print('\n' + '='*70)
+            print('1️⃣ 2️⃣  北海道電力基本プランと市場価格連動プランを並列で最適化実行中...')
+            print('='*70)
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                hokkaido_future = executor.submit(_run_rolling_timed, (df, params, dict(rolling_kwargs, price_data=None)))
+                market_future = executor.submit(_run_rolling_timed, (df, params, dict(rolling_kwargs, price_data=price_data)))
+                df_res_hokkaido, hokkaido_elapsed = hokkaido_future.result()
+                df_res_market, market_elapsed = market_future.result()
+        else:
+            print('\n' + '='*70)
+            print('1️⃣  北海道電力基本プランで最適化実行中...')
+            print('='*70)
+            print('プラン: 北海道電力基本プラン (電力量料金+燃料費調整額+再エネ賦課金)')
 
-        hokkaido_start_time = time.time()
-        df_res_hokkaido = run_rolling(df, horizon=args.horizon, control_horizon=args.control_horizon, time_limit=args.time_limit,
-                                       max_steps=args.max_steps, params=params, price_data=None)
-        hokkaido_elapsed = time.time() - hokkaido_start_time
+            df_res_hokkaido, hokkaido_elapsed = _run_rolling_timed((df, params, dict(rolling_kwargs, price_data=None)))
         timing_info['hokkaido_basic_seconds'] = hokkaido_elapsed
         print(f'✓ 北海道電力基本プラン完了: {hokkaido_elapsed:.1f}秒 ({hokkaido_elapsed/60:.1f}分)')
 
@@ -1255,21 +1540,21 @@ def main():
         df_res_hokkaido.to_csv(out_csv_hokkaido)
         print(f'✓ Saved {out_csv_hokkaido}')
 
-        hokkaido_costs = calculate_single_plan_costs(df_res_hokkaido, None, 'hokkaido_basic')
+        # 月番号は1回だけ計算し、市場連動プランの結果が同じindexの場合のみ使い回す
+        months_idx = df_res_hokkaido.index.month.to_numpy()
+        hokkaido_costs = calculate_single_plan_costs(df_res_hokkaido, None, 'hokkaido_basic', months=months_idx)
 
         # ========================================
         # 2️⃣ 市場価格連動プランで最適化 (ローリングモードのみ)
         # ========================================
-        if not args.use_fixed_price and price_data is not None:
-            print('\n' + '='*70)
-            print('2️⃣  市場価格連動プランで最適化実行中...')
-            print('='*70)
-            print('プラン: 市場価格連動プラン (JEPX spot price data)')
-
-            market_start_time = time.time()
-            df_res_market = run_rolling(df, horizon=args.horizon, control_horizon=args.control_horizon, time_limit=args.time_limit,
-                                         max_steps=args.max_steps, params=params, price_data=price_data)
-            market_elapsed = time.time() - market_start_time
+        if run_market:
+            if df_res_market is None:
+                print('\n' + '='*70)
+                print('2️⃣  市場価格連動プランで最適化実行中...')
+                print('='*70)
+                print('プラン: 市場価格連動プラン (JEPX spot price data)')
+
+                df_res_market, market_elapsed = _run_rolling_timed((df, params, dict(rolling_kwargs, price_data=price_data)))
             timing_info['market_linked_seconds'] = market_elapsed
             print(f'✓ 市場価格連動プラン完了: {market_elapsed:.1f}秒 ({market_elapsed/60:.1f}分)')
 
@@ -1277,50 +1562,48 @@ def main():
             df_res_market.to_csv(out_csv_market)
             print(f'✓ Saved {out_csv_market}')
 
-            market_costs = calculate_single_plan_costs(df_res_market, price_data, 'market_linked')
+            # ソルバー例外で途中終了した場合など、行数が異なれば index から計算し直す
+            market_months = months_idx if df_res_market.index.equals(df_res_hokkaido.index) else None
+            market_costs = calculate_single_plan_costs(df_res_market, price_data, 'market_linked', months=market_months)
             df_res = df_res_market
+            src_csv = out_csv_market
         else:
             market_costs = None
             df_res = df_res_hokkaido
+            src_csv = out_csv_hokkaido
 
-        # メインの結果CSVもSOC容量ごとに保存
+        # メインの結果CSVもSOC容量ごとに保存（プラン別CSVと同一内容なのでファイルコピー）
         out_csv_main = os.path.join(results_dir, 'rolling_results.csv')
-        df_res.to_csv(out_csv_main)
+        shutil.copyfile(src_csv, out_csv_main)
         print(f'\n✓ Saved {out_csv_main} (メイン結果)')
 
     # ========================================
-    # 年間グラフの自動生成
-    try:
-        import subprocess
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        annual_graph_script = os.path.join(script_dir, 'generate_annual_graph.py')
-        subprocess.run(['python3', annual_graph_script, '--soc', soc_label, '--horizon', str(args.horizon)], check=True)
-        print('✓ 年間グラフ（PV発電・買電・需要、SOC推移）の生成が完了しました')
-    except Exception as e:
-        print(f'⚠ 年間グラフの生成に失敗しました: {e}')
-        traceback.print_exc()
-
-    # 日次パターングラフの自動生成
-    try:
-        import subprocess
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        daily_pattern_script = os.path.join(script_dir, 'generate_daily_pattern.py')
-        subprocess.run(['python3', daily_pattern_script, '--soc', soc_label, '--horizon', str(args.horizon)], check=True)
-        print('✓ 日次パターングラフ（2024年5月15日）の生成が完了しました')
-    except Exception as e:
-        print(f'⚠ 日次パターングラフの生成に失敗しました: {e}')
-        traceback.print_exc()
+    # 年間グラフ・日次パターン・PV余剰パターンの自動生成
+    # サブプロセスではなくインプロセスで呼び出す。各スクリプトが読む rolling_results.csv が
+    # 直前に保存したものと同じ場合は、メモリ上の df_res を渡してCSVの再読み込みを省く
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    if args.mode != 'annual' and args.horizon == 96 and args.control_horizon == 1:
+        df_graph = df_res.reset_index()
+    else:
+        df_graph = None
 
-    # PV余剰パターングラフの自動生成
-    try:
-        import subprocess
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        pv_curtailment_script = os.path.join(script_dir, 'generate_pv_curtailment_pattern.py')
-        subprocess.run(['python3', pv_curtailment_script, '--soc', soc_label, '--horizon', str(args.horizon)], check=True)
-        print('✓ PV余剰パターングラフ（最大余剰日）の生成が完了しました')
-    except Exception as e:
-        print(f'⚠ PV余剰パターングラフの生成に失敗しました: {e}')
-        traceback.print_exc()
+    graph_jobs = [
+        ('generate_annual_graph', '年間グラフ（PV発電・買電・需要、SOC推移）'),
+        ('generate_daily_pattern', '日次パターングラフ（2024年5月15日）'),
+        ('generate_pv_curtailment_pattern', 'PV余剰パターングラフ（最大余剰日）'),
+    ]
+    for module_name, description in graph_jobs:
+        # 各スクリプトはimport時にフォント設定を書き換えるため rc_context で元に戻す
+        with plt.rc_context():
+            try:
+                module = importlib.import_module(module_name)
+                module.run(soc=soc_label, horizon=args.horizon, df_res=df_graph)
+                print(f'✓ {description}の生成が完了しました')
+            except Exception as e:
+                print(f'⚠ {description}の生成に失敗しました: {e}')
+                traceback.print_exc()
 
     # 全体の計算時間を記録
     total_elapsed = time.time() - total_start_time
@@ -1354,7 +1637,6 @@ def main():
     comparison_data['timing'] = timing_info
 
     # 年間料金比較データをJSONファイルに保存
-    import json
     json_path = os.path.join(results_dir, 'annual_cost_comparison.json')
     with open(json_path, 'w', encoding='utf-8') as f:
         json.dump(comparison_data, f, ensure_ascii=False, indent=2)
@@ -1366,9 +1648,10 @@ def main():
     print('='*70)
 
     # グラフもSOCごとにpng/socXXX/へ保存
-    images, out_pdf = save_plots_and_pdf(df_res, out_prefix='rolling_results', png_dir=png_dir)
+    images, out_pdf = save_plots_and_pdf(df_res, out_prefix='rolling_results', png_dir=png_dir, want_pdf=args.pdf)
     print('✓ Saved images:', images)
-    print('✓ Saved PDF:', out_pdf)
+    if out_pdf is not None:
+        print('✓ Saved PDF:', out_pdf)
 
     # 月別統計グラフの自動生成
     try:
@@ -1391,7 +1674,8 @@ def main():
         print('  ✓ 市場価格連動プラン結果: results/rolling_results_market_linked.csv')
     print('  ✓ メイン結果CSV: results/rolling_results.csv')
     print('  ✓ 年間料金比較JSON: results/annual_cost_comparison.json')
-    print('  ✓ 基本グラフPDF: scripts/rolling_results.pdf')
+    if out_pdf is not None:
+        print(f'  ✓ 基本グラフPDF: {out_pdf}')
     print('\n📊 すべてのグラフ (png/):')
     print('  • rolling_results_timeseries.png')
     print('  • rolling_results_buysell.png')
@@ -1407,7 +1691,63 @@ def main():
     print('\n' + '='*70)
 
 
-def calculate_single_plan_costs(df_res, price_data=None, plan_type='hokkaido_basic'):
+def _nearest_values(src_index, src_values, target_index):
+    """
+    reindex(method='nearest') 相当の値取得をソート済み時刻配列の searchsorted で行う
+
+    等距離の場合は pandas と同じく後ろ側（新しい時刻）の値を採用する。
+    """
+    src_ts = np.asarray(src_index, dtype='datetime64[ns]')
+    tgt_ts = np.asarray(target_index, dtype='datetime64[ns]')
+    if len(src_ts) == 1:
+        return np.full(len(tgt_ts), src_values[0], dtype=float)
+    pos = np.clip(np.searchsorted(src_ts, tgt_ts), 1, len(src_ts) - 1)
+    left_dist = np.abs(tgt_ts - src_ts[pos - 1])
+    right_dist = np.abs(src_ts[pos] - tgt_ts)
+    return np.where(left_dist < right_dist, src_values[pos - 1], src_values[pos])
+
+
+def _market_energy_costs(df_res, price_data, renewable_levy=3.98):
+    """
+    市場価格連動プランの電力量料金と再エネ賦課金を計算
+
+    df_res をコピーして価格列を追加する代わりに、価格と買電量をNumPy配列で掛け合わせる。
+
+    Returns:
+        tuple: (市場価格での電力量料金（再エネ賦課金は含まない）, 再エネ賦課金)
+    """
+    price = _nearest_values(price_data.index, price_data['price_yen_per_kWh'].to_numpy(), df_res.index)
+    sby = df_res['sBY'].to_numpy()
+    market_energy_cost = float(np.nansum(sby * price)) * 0.5
+    renewable_levy_cost = float(np.nansum(sby)) * renewable_levy * 0.5
+    return market_energy_cost, renewable_levy_cost
+
+
+def _monthly_sum_max(months, values):
+    """
+    月番号配列 months（1〜12）ごとの合計と最大値をNumPyで集計（pandas groupby の代替）
+
+    Returns:
+        (月別合計 Series, 月別最大 Series)  ※データのある月のみ、index名は 'month'
+    """
+    months = np.asarray(months)
+    values = np.asarray(values, dtype=float)
+    counts = np.bincount(months, minlength=13)
+    sums = np.bincount(months, weights=values, minlength=13)
+    maxima = np.full(13, -np.inf)
+    np.maximum.at(maxima, months, values)
+    present = pd.Index(np.flatnonzero(counts), name='month')
+    return pd.Series(sums[present], index=present), pd.Series(maxima[present], index=present)
+
+
+def _monthly_sby(df_res, months=None):
+    """買電量 sBY の月別合計・最大（months: 事前計算済みの月番号配列、Noneなら index から計算）"""
+    if months is None:
+        months = df_res.index.month.to_numpy()
+    return _monthly_sum_max(months, df_res['sBY'].to_numpy())
+
+
+def calculate_single_plan_costs(df_res, price_data=None, plan_type='hokkaido_basic', months=None):
     """
     単一プランの年間電気料金を計算
 
@@ -1415,46 +1755,29 @@ def calculate_single_plan_costs(df_res, price_data=None, plan_type='hokkaido_bas
         df_res: 最適化結果DataFrame
         price_data: JEPX価格データ (市場価格連動プラン用、Noneの場合は北海道電力プラン)
         plan_type: 'hokkaido_basic' or 'market_linked'
+        months: df_res.index.month の事前計算値（同じindexで複数回呼ぶ場合に使い回す）
 
     Returns:
         dict: 年間料金詳細
     """
-    # 月別データを集計
-    df_monthly = df_res.copy()
-    df_monthly['month'] = df_monthly.index.month
-
-    # 月別電力使用量と最大需要電力を計算
-    monthly_energy = df_monthly.groupby('month')['sBY'].sum() * 0.5  # 30分→kWh変換
-    monthly_peak = df_monthly.groupby('month')['sBY'].max()  # 月間最大需要
-    annual_peak = df_monthly['sBY'].max()  # 年間最大需要（契約電力）
-    annual_buy_kWh = df_monthly['sBY'].sum() * 0.5  # 年間買電量
+    annual_peak = df_res['sBY'].max()  # 年間最大需要（契約電力）
+    annual_buy_kWh = df_res['sBY'].sum() * 0.5  # 年間買電量
 
     if plan_type == 'hokkaido_basic' or price_data is None:
-        # 北海道電力基本プラン
-        total_costs = {'basic_charge': 0, 'energy_charge': 0, 'fuel_adjustment': 0, 'renewable_levy': 0}
-
-        for month in range(1, 13):
-            if month in monthly_energy.index:
-                month_energy = monthly_energy[month]
-                costs = calculate_hokkaido_electricity_cost(
-                    month_energy, annual_peak, month, 2024, 'hokkaido_basic'
-                )
-                for key in total_costs:
-                    total_costs[key] += costs[key]
-
-        total_costs['total'] = sum(total_costs.values())
+        # 月別電力使用量（月別集計は基本プランの料金計算でのみ使用）
+        monthly_energy = _monthly_sby(df_res, months)[0] * 0.5  # 30分→kWh変換
+
+        # 北海道電力基本プラン（データのある月のみ、月別料金を一括計算して合計）
+        monthly_costs = calculate_hokkaido_costs_by_month(
+            monthly_energy[monthly_energy.index.isin(range(1, 13))], annual_peak, 2024, 'hokkaido_basic'
+        )
+        total_costs = monthly_costs.sum().to_dict()
         total_costs['peak_demand_kW'] = annual_peak
         total_costs['annual_buy_kWh'] = annual_buy_kWh
 
     else:
         # 市場価格連動プラン
-        df_with_prices = df_res.copy()
-        price_series = price_data.reindex(df_res.index, method='nearest')
-        df_with_prices['jepx_price'] = price_series['price_yen_per_kWh']
-
-        # 市場価格での電力量料金（再エネ賦課金は含まない）
-        market_energy_cost = (df_with_prices['sBY'] * df_with_prices['jepx_price'] * 0.5).sum()
-        renewable_levy_cost = (df_with_prices['sBY'] * 3.98 * 0.5).sum()
+        market_energy_cost, renewable_levy_cost = _market_energy_costs(df_res, price_data)
 
         # 基本料金は北海道電力と同じ
         basic_charge_annual = annual_peak * 2829.60 * 0.85 * 12
@@ -1471,52 +1794,34 @@ def calculate_single_plan_costs(df_res, price_data=None, plan_type='hokkaido_bas
     return total_costs
 
 
-def calculate_annual_costs(df_res, price_data=None):
+def calculate_annual_costs(df_res, price_data=None, months=None):
     """
     年間電気料金を計算し、両プランを比較
 
     Args:
         df_res: 最適化結果DataFrame
         price_data: JEPX価格データ (市場価格連動プラン用)
+        months: df_res.index.month の事前計算値（Noneなら index から計算）
 
     Returns:
         dict: 年間料金比較結果
     """
-    # 月別データを集計
-    df_monthly = df_res.copy()
-    df_monthly['month'] = df_monthly.index.month
-    df_monthly['year'] = df_res.index[0].year
-
-    # 月別電力使用量と最大需要電力を計算
-    monthly_energy = df_monthly.groupby('month')['sBY'].sum() * 0.5  # 30分→kWh変換
-    monthly_peak = df_monthly.groupby('month')['sBY'].max()  # 月間最大需要
-    annual_peak = df_monthly['sBY'].max()  # 年間最大需要（契約電力）
-
-    # 北海道電力基本プラン
-    hokkaido_total = {'basic_charge': 0, 'energy_charge': 0, 'fuel_adjustment': 0, 'renewable_levy': 0}
-
-    for month in range(1, 13):
-        if month in monthly_energy.index:
-            month_energy = monthly_energy[month]
-            month_peak = monthly_peak[month]
-            costs = calculate_hokkaido_electricity_cost(
-                month_energy, annual_peak, month, 2024, 'hokkaido_basic'
-            )
-            for key in hokkaido_total:
-                hokkaido_total[key] += costs[key]
+    # 月別電力使用量と最大需要電力を計算（NumPyで1パス集計、DataFrameはコピーしない）
+    monthly_sby, monthly_peak = _monthly_sby(df_res, months)  # monthly_peak: 月間最大需要
+    monthly_energy = monthly_sby * 0.5  # 30分→kWh変換
+    annual_peak = df_res['sBY'].max()  # 年間最大需要（契約電力）
+
+    # 北海道電力基本プラン（データのある月のみ、月別料金を一括計算して合計）
+    hokkaido_total = calculate_hokkaido_costs_by_month(
+        monthly_energy[monthly_energy.index.isin(range(1, 13))], annual_peak, 2024, 'hokkaido_basic'
+    ).sum().to_dict()
 
     # 市場価格連動プラン
     market_total = {'basic_charge': 0, 'energy_charge': 0, 'renewable_levy': 0}
 
     if price_data is not None:
         # 実際のJEPX価格データを使用
-        df_with_prices = df_res.copy()
-        price_series = price_data.reindex(df_res.index, method='nearest')
-        df_with_prices['jepx_price'] = price_series['price_yen_per_kWh']
-
-        # 市場価格での電力量料金（再エネ賦課金は含まない）
-        market_energy_cost = (df_with_prices['sBY'] * df_with_prices['jepx_price'] * 0.5).sum()
-        renewable_levy_cost = (df_with_prices['sBY'] * 3.98 * 0.5).sum()
+        market_energy_cost, renewable_levy_cost = _market_energy_costs(df_res, price_data)
     else:
         # 固定価格での概算
         total_energy = monthly_energy.sum()
@@ -1533,8 +1838,6 @@ def calculate_annual_costs(df_res, price_data=None):
         'total': basic_charge_annual + market_energy_cost + renewable_levy_cost
     }
 
-    hokkaido_total['total'] = sum(hokkaido_total.values())
-
     return {
         'hokkaido_basic': hokkaido_total,
         'market_linked': market_total,
@@ -1572,21 +1875,6 @@ def setup_logging(logfile: Optional[str] = None, level: int = logging.INFO):
     return logger
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Rolling optimization runner')
-    parser.add_argument('--logfile', type=str, default=None, help='Path to logfile (optional)')
-    # parse only logfile here and pass the rest to main via sys.argv
-    known_args, remaining = parser.parse_known_args()
-
-    # initialize logging
-    setup_logging(known_args.logfile)
-
-    # call main with remaining args available in sys.argv
-    # reconstruct argv for the main argument parser
-    sys.argv = [sys.argv[0]] + remaining
-    main()
-
-
 def run_period_from_df(df, start=None, end=None, out_prefix='rolling_results', horizon=96, time_limit=10.0,
                        max_steps=None, params=None, price_data=None, control_horizon=1, sheet_name=None,
                        force_year=None):
@@ -1599,13 +1887,8 @@ def run_period_from_df(df, start=None, end=None, out_prefix='rolling_results', h
     # Optionally remap the datetime index to a different year while keeping month/day/time
     df_proc = df.copy()
     if force_year is not None:
-        def remap_year(ts):
-            try:
-                return ts.replace(year=int(force_year))
-            except Exception:
-                return pd.Timestamp(year=int(force_year), month=ts.month, day=ts.day, hour=ts.hour, minute=ts.minute, second=ts.second)
-
-        df_proc.index = df_proc.index.map(remap_year)
+        df_proc.index = _remap_year(df_proc.index, int(force_year))
+        df_proc = df_proc[df_proc.index.notna()]  # 存在しない日付（2/29）は除外
 
     # slice by start/end if provided (after optional remap)
     if start is not None:
@@ -1622,7 +1905,7 @@ def run_period_from_df(df, start=None, end=None, out_prefix='rolling_results', h
     out_csv = f'{out_prefix}.csv'
     df_res.to_csv(out_csv)
 
-    images, out_pdf = save_plots_and_pdf(df_res, out_prefix=out_prefix)
+    images, out_pdf = save_plots_and_pdf(df_res, out_prefix=out_prefix, want_pdf=True)
     return df_res, images, out_pdf, out_csv
 
 
@@ -1653,7 +1936,58 @@ def run_period_from_dates(excel_path, start, end, out_prefix='rolling_results',
 # Data Validation Module
 ###############################################################################
 
-def validate_results(csv_path='results/rolling_results.csv', battery_capacity=860.0, output_report=True):
+def _load_results(csv_path, columns=None):
+    """
+    rolling_results.csv 形式の結果CSVを pyarrow エンジンで読み込む
+
+    Args:
+        csv_path: 結果CSVのパス
+        columns: 読み込む列名の候補（Noneなら全列）。CSVに存在しない列は無視する
+
+    Returns:
+        DataFrame: timestamp は datetime64、status はカテゴリ型
+    """
+    usecols = None
+    if columns is not None:
+        header = pd.read_csv(csv_path, nrows=0).columns
+        usecols = [c for c in header if c in columns]
+    df = pd.read_csv(csv_path, usecols=usecols, engine='pyarrow')
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    if 'status' in df.columns:
+        df['status'] = df['status'].astype('category')
+    return df
+
+
+def soc_trajectory(charge, discharge, eff=0.98, dt=0.5, soc0=430.0):
+    """
+    充放電量からSOC推移を再計算する（bF[k] = bF[k-1] + eff*xFC1[k]*dt - xFD1[k]*dt）
+
+    漸化式は線形なので、Pythonループではなく累積和で一括に計算する
+
+    Args:
+        charge: 充電電力 xFC1 [kW] の配列
+        discharge: 放電電力 xFD1 [kW] の配列
+        eff: 充電効率
+        dt: ステップ幅 [h]
+        soc0: 初期SOC [kWh]
+
+    Returns:
+        ndarray: 長さ len(charge)+1 のSOC配列（先頭が soc0）
+    """
+    delta = (eff * dt) * np.asarray(charge, dtype=float) - dt * np.asarray(discharge, dtype=float)
+    out = np.empty(delta.shape[0] + 1)
+    out[0] = soc0
+    np.cumsum(delta, out=out[1:])
+    out[1:] += soc0
+    return out
+
+
+# validate_results が参照する列（CSV読み込み時はこの列だけを読む）
+VALIDATION_COLUMNS = ('timestamp', 'sBY', 'bF', 'xFC1', 'xFD1', 'pv_kW', 'pv_used_kW', 'demand_kW', 'pv_surplus_kW')
+
+
+def validate_results(csv_path='results/rolling_results.csv', battery_capacity=860.0, output_report=True, df=None,
+                     alpha_FC=0.98):
     """
     統合データ検証機能: 最適化結果の妥当性を包括的に検証
 
@@ -1662,27 +1996,33 @@ def validate_results(csv_path='results/rolling_results.csv', battery_capacity=86
     2. バッテリーがフル充電された日の特定
     3. 年間統計の計算 (総買電量、平均買電、平均SOC)
     4. 特定日付のデータ検証
+    5. SOC整合性（充放電量から再計算したSOCと bF の差）
 
     Args:
         csv_path: 検証対象のCSVファイルパス
         battery_capacity: バッテリー容量 [kWh]
         output_report: Trueの場合、検証レポートを出力
+        df: 最適化結果DataFrame（メモリ上）。指定時はCSVを読まずにこれを検証する
+        alpha_FC: SOC再計算に使う充電効率（最適化時の params['alpha_FC'] と合わせる）
 
     Returns:
         dict: 検証結果を含む辞書
     """
-    import pandas as pd
-    import numpy as np
-    from pathlib import Path
 
-    if not Path(csv_path).exists():
-        print(f"警告: {csv_path} が見つかりません")
-        return None
+    if df is not None:
+        if 'timestamp' not in df.columns:
+            df = df.reset_index()
+        df = df[[c for c in VALIDATION_COLUMNS if c in df.columns]].copy()
+    else:
+        if not Path(csv_path).exists():
+            print(f"警告: {csv_path} が見つかりません")
+            return None
 
-    # timestampカラムを読み込み（datetimeではなくtimestamp）
-    df = pd.read_csv(csv_path)
+        # 検証に使う列だけを読み込み（timestampカラム、datetimeではなくtimestamp）
+        df = _load_results(csv_path, columns=VALIDATION_COLUMNS)
     df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['date'] = pd.Series(df['timestamp'].dt.date) # type: ignore
+    # 日付キーは datetime64 のまま（.dt.date の Python date オブジェクトより groupby が高速）
+    df['date'] = df['timestamp'].dt.normalize()
 
     validation_results = {}
 
@@ -1691,21 +2031,20 @@ def validate_results(csv_path='results/rolling_results.csv', battery_capacity=86
 
     # 1. PV余剰日の特定（pv_surplus_kW列を使用）
     if 'pv_surplus_kW' in df.columns:
-        df['pv_surplus_kWh'] = df['pv_surplus_kW'] * 0.5  # 30分値なのでkWhに変換
-        daily_surplus = df.groupby('date')['pv_surplus_kWh'].sum().reset_index()
-        daily_surplus.columns = ['date', 'total_surplus']
-        daily_surplus = daily_surplus[daily_surplus['total_surplus'] > 0].sort_values('total_surplus', ascending=False)
-        validation_results['pv_surplus_days'] = daily_surplus.head(10).to_dict('records')
+        daily_surplus = df.groupby('date')['pv_surplus_kW'].sum() * 0.5  # 30分値なのでkWhに変換
+        daily_surplus = daily_surplus[daily_surplus > 0].sort_values(ascending=False).head(10)
+        validation_results['pv_surplus_days'] = (
+            pd.DataFrame({'date': daily_surplus.index.date, 'total_surplus': daily_surplus.to_numpy()}).to_dict('records'))
     else:
         validation_results['pv_surplus_days'] = []
 
     # 2. フル充電日の特定（bF列を使用）
     if 'bF' in df.columns:
         full_charge_threshold = battery_capacity * 0.95  # 95%以上をフル充電とみなす
-        full_charge_days = df[df['bF'] >= full_charge_threshold].groupby('date').size().reset_index()
-        full_charge_days.columns = ['date', 'full_charge_steps']
-        full_charge_days = full_charge_days.sort_values('full_charge_steps', ascending=False)
-        validation_results['full_charge_days'] = full_charge_days.head(10).to_dict('records')
+        full_charge_days = df['date'][df['bF'] >= full_charge_threshold].value_counts(sort=False).sort_index()
+        full_charge_days = full_charge_days.sort_values(ascending=False).head(10)
+        validation_results['full_charge_days'] = (
+            pd.DataFrame({'date': full_charge_days.index.date, 'full_charge_steps': full_charge_days.to_numpy()}).to_dict('records'))
     else:
         validation_results['full_charge_days'] = []
 
@@ -1741,7 +2080,7 @@ def validate_results(csv_path='results/rolling_results.csv', battery_capacity=86
         available_cols = [c for c in cols if c in df.columns]
         validation_results['sample_dates']['max_surplus'] = {
             'date': str(max_surplus_date),
-            'data': df[df['date'] == max_surplus_date][available_cols].to_dict('records')
+            'data': df[df['date'] == pd.Timestamp(max_surplus_date)][available_cols].to_dict('records')
         }
 
     # フル充電が最も長い日
@@ -1751,9 +2090,19 @@ def validate_results(csv_path='results/rolling_results.csv', battery_capacity=86
         available_cols = [c for c in cols if c in df.columns]
         validation_results['sample_dates']['max_full_charge'] = {
             'date': str(max_full_charge_date),
-            'data': df[df['date'] == max_full_charge_date][available_cols].to_dict('records')
+            'data': df[df['date'] == pd.Timestamp(max_full_charge_date)][available_cols].to_dict('records')
         }
 
+    # 5. SOC整合性（初期SOCは容量や bF0 の設定に依存しないよう、1ステップ目の bF から逆算する）
+    if all(c in df.columns for c in ('bF', 'xFC1', 'xFD1')) and len(df):
+        xfc1 = df['xFC1'].to_numpy()
+        xfd1 = df['xFD1'].to_numpy()
+        bF = df['bF'].to_numpy()
+        soc0 = bF[0] - alpha_FC * xfc1[0] * 0.5 + xfd1[0] * 0.5
+        traj = soc_trajectory(xfc1, xfd1, alpha_FC, 0.5, soc0)
+        max_err = float(np.abs(traj[1:] - bF).max())
+        validation_results['soc_consistency'] = {'max_abs_error_kwh': max_err, 'consistent': max_err < 1e-3}
+
     # レポート出力
     if output_report:
         print("\n" + "="*80)
@@ -1780,46 +2129,71 @@ def validate_results(csv_path='results/rolling_results.csv', battery_capacity=86
         for i, day in enumerate(validation_results['full_charge_days'], 1):
             print(f"  {i:2d}. {day['date']}  フル充電ステップ数: {day['full_charge_steps']:>3d}")
 
+        if 'soc_consistency' in validation_results:
+            soc_check = validation_results['soc_consistency']
+            print("\n【SOC整合性】")
+            print(f"  再計算SOCとの最大誤差: {soc_check['max_abs_error_kwh']:.2e} kWh "
+                  f"({'OK' if soc_check['consistent'] else 'NG'})")
+
         print("\n" + "="*80 + "\n")
 
     return validation_results
 
 
-def verify_specific_dates(csv_path='results/rolling_results.csv', dates_to_check=None):
+def verify_specific_dates(csv_path='results/rolling_results.csv', dates_to_check=None, df=None):
     """
     特定日付のデータを詳細に検証
 
     Args:
         csv_path: 検証対象のCSVファイルパス
         dates_to_check: 検証する日付のリスト (例: ['2024-06-02', '2024-03-08'])
+        df: 読み込み済みの結果DataFrame。指定時はCSVを読まずにこれを使う
 
     Returns:
         dict: 日付ごとの検証結果
     """
-    import pandas as pd
-    from pathlib import Path
 
-    if not Path(csv_path).exists():
+    if df is None and not Path(csv_path).exists():
         print(f"警告: {csv_path} が見つかりません")
         return None
 
     if dates_to_check is None:
         dates_to_check = []
 
-    df = pd.read_csv(csv_path)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['date'] = df['timestamp'].apply(lambda x: x.date())
+    if df is None:
+        df = _load_results(csv_path)
+    elif 'timestamp' not in df.columns:
+        df = df.reset_index()
+    # 日付キーは datetime64 のまま（行ごとの x.date() 呼び出しを避ける）
+    date_key = df['timestamp'].dt.floor('D')
+    # 検証対象日の行だけに先に絞り込み、以降の索引作成・時刻抽出は対象日の数日分だけで行う
+    in_target = date_key.isin(pd.DatetimeIndex([pd.Timestamp(d).floor('D') for d in dates_to_check])).to_numpy()
+    df = df.loc[in_target]
+    date_key = date_key[in_target]
+
+    # 日付→行位置の索引を1回だけ作り、日付ごとの全行スキャンを避ける
+    day_positions = df.groupby(date_key).indices
+    # 各日の 14:00台 / 16:00台 の最初のSOCも事前に日付で引けるようにしておく
+    hour = df['timestamp'].dt.hour.to_numpy()
+    soc_at_hour = {}
+    if 'bF' in df.columns:
+        for h in (14, 16):
+            soc = pd.Series(df['bF'].to_numpy()[hour == h], index=date_key[hour == h])
+            soc_at_hour[h] = soc[~soc.index.duplicated()]
 
     results = {}
 
     for date_str in dates_to_check:
-        target_date = pd.to_datetime(date_str).date()
-        day_data = df[df['date'] == target_date]
+        target_date = pd.Timestamp(date_str).floor('D')
+        positions = day_positions.get(target_date)
 
-        if len(day_data) == 0:
+        if positions is None:
             results[date_str] = {'error': 'データが見つかりません'}
             continue
+        day_data = df.iloc[positions]
 
+        soc_14 = soc_at_hour[14].get(target_date) if 'bF' in df.columns else None
+        soc_16 = soc_at_hour[16].get(target_date) if 'bF' in df.columns else None
         results[date_str] = {
             'total_demand': round(day_data['demand_kW'].sum() * 0.5, 1) if 'demand_kW' in day_data.columns else 0,
             'total_pv': round(day_data['pv_kW'].sum() * 0.5, 1) if 'pv_kW' in day_data.columns else 0,
@@ -1828,8 +2202,8 @@ def verify_specific_dates(csv_path='results/rolling_results.csv', dates_to_check
             'avg_soc': round(day_data['bF'].mean(), 1) if 'bF' in day_data.columns else 0,
             'max_soc': round(day_data['bF'].max(), 1) if 'bF' in day_data.columns else 0,
             'min_soc': round(day_data['bF'].min(), 1) if 'bF' in day_data.columns else 0,
-            'soc_at_14:00': round(day_data[day_data['timestamp'].dt.hour == 14].iloc[0]['bF'], 1) if 'bF' in day_data.columns and len(day_data[day_data['timestamp'].dt.hour == 14]) > 0 else None,
-            'soc_at_16:00': round(day_data[day_data['timestamp'].dt.hour == 16].iloc[0]['bF'], 1) if 'bF' in day_data.columns and len(day_data[day_data['timestamp'].dt.hour == 16]) > 0 else None
+            'soc_at_14:00': round(soc_14, 1) if soc_14 is not None else None,
+            'soc_at_16:00': round(soc_16, 1) if soc_16 is not None else None
         }
 
         print(f"\n【{date_str} のデータ】")
@@ -1849,7 +2223,7 @@ def verify_specific_dates(csv_path='results/rolling_results.csv', dates_to_check
 
 
 def find_representative_day(csv_path='results/rolling_results.csv', battery_capacity=860.0,
-                            min_surplus=1.0, max_surplus=10.0):
+                            min_surplus=1.0, max_surplus=10.0, as_records=False, df=None):
     """
     PV余剰が発生し、かつバッテリーがフル充電される「代表日」を検索
 
@@ -1858,36 +2232,40 @@ def find_representative_day(csv_path='results/rolling_results.csv', battery_capa
         battery_capacity: バッテリー容量 [kWh]
         min_surplus: 最小余剰量 [kWh]
         max_surplus: 最大余剰量 [kWh]
+        as_records: True の場合は従来どおり行ごとの dict のリストで返す
+        df: 読み込み済みの結果DataFrame。指定時はCSVを読まずにこれを使う
 
     Returns:
-        list: 条件を満たす日付のリスト
+        dict: 列名 -> numpy配列（'date', 'total_surplus', 'full_charge_steps'）。
+              as_records=True の場合は条件を満たす日の dict のリスト
     """
-    import pandas as pd
-    from pathlib import Path
 
-    if not Path(csv_path).exists():
+    if df is None and not Path(csv_path).exists():
         print(f"警告: {csv_path} が見つかりません")
         return None
 
-    df = pd.read_csv(csv_path)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['date'] = df['timestamp'].apply(lambda x: x.date())
-
-    # PV余剰量をkWhに変換
-    if 'pv_surplus_kW' in df.columns:
-        df['pv_surplus_kWh'] = df['pv_surplus_kW'] * 0.5
-    else:
-        df['pv_surplus_kWh'] = 0
+    if df is None:
+        # 集計に使う3列だけを読み込む
+        df = _load_results(csv_path, columns=('timestamp', 'pv_surplus_kW', 'bF'))
+    elif 'timestamp' not in df.columns:
+        df = df.reset_index()
+    # 日付キーは datetime64 のまま（行ごとの x.date() 呼び出しを避ける）
+    date = df['timestamp'].dt.floor('D').rename('date')
 
     # フル充電の閾値（容量の95%）
     full_charge_threshold = battery_capacity * 0.95
 
-    # 各日の余剰量とフル充電達成を集計
-    daily_stats = df.groupby('date').agg({
-        'pv_surplus_kWh': 'sum',
-        'bF': lambda x: (x >= full_charge_threshold).sum() if 'bF' in df.columns else 0
-    }).reset_index()
-    daily_stats.columns = ['date', 'total_surplus', 'full_charge_steps']
+    # フル充電判定は事前にベクトル化したフラグ列にしておく
+    # （groupby の lambda による per-group の Python 呼び出しを避け、組み込みの sum だけで集計）
+    per_step = pd.DataFrame({
+        'total_surplus': df['pv_surplus_kW'] if 'pv_surplus_kW' in df.columns else 0.0,
+        'full_charge_steps': (df['bF'] >= full_charge_threshold) if 'bF' in df.columns else 0,
+    }, index=df.index)
+
+    # 各日の余剰量とフル充電達成を集計（kWhへの変換×0.5は日別の集計値にだけ掛ける）
+    # 結果CSVは時系列順なので、出現順（sort=False）でも日付順になる。キーの事前ソートは不要
+    daily_stats = per_step.groupby(date, sort=False).sum().reset_index()
+    daily_stats['total_surplus'] *= 0.5
 
     # 条件: min_surplus <= 余剰 <= max_surplus かつ フル充電あり
     candidates = daily_stats[
@@ -1895,17 +2273,40 @@ def find_representative_day(csv_path='results/rolling_results.csv', battery_capa
         (daily_stats['total_surplus'] <= max_surplus) &
         (daily_stats['full_charge_steps'] > 0)
     ].sort_values('total_surplus')
+    # 出力・戻り値の日付は従来どおり datetime.date
+    candidates['date'] = candidates['date'].dt.date
 
     print("\n【代表日候補】")
     print(f"条件: PV余剰 {min_surplus}~{max_surplus} kWh, フル充電達成（SOC >= {full_charge_threshold:.0f} kWh）")
     print("-" * 60)
 
-    for _, row in candidates.iterrows():
-        print(f"  {row['date']}  余剰: {row['total_surplus']:>6.1f} kWh, フル充電: {row['full_charge_steps']:>2d} ステップ")
+    # iterrows（行ごとにSeriesを生成）ではなく列配列をzipし、1回の print でまとめて出力
+    lines = [f"  {date}  余剰: {total_surplus:>6.1f} kWh, フル充電: {full_charge_steps:>2d} ステップ"
+             for date, total_surplus, full_charge_steps in zip(candidates['date'], candidates['total_surplus'].to_numpy(),
+                                                               candidates['full_charge_steps'].to_numpy())]
+    if lines:
+        print('\n'.join(lines))
 
-    return candidates.to_dict('records')
+    if as_records:
+        return candidates.to_dict('records')
+    # 列ごとの配列で返す（呼び出し側はブールインデックスで一括に絞り込める）
+    return {c: candidates[c].to_numpy() for c in candidates.columns}
 
 
 ###############################################################################
 # Main execution with validation support
 ###############################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rolling optimization runner')
+    parser.add_argument('--logfile', type=str, default=None, help='Path to logfile (optional)')
+    # parse only logfile here and pass the rest to main via sys.argv
+    known_args, remaining = parser.parse_known_args()
+
+    # initialize logging
+    setup_logging(known_args.logfile)
+
+    # call main with remaining args available in sys.argv
+    # reconstruct argv for the main argument parser
+    sys.argv = [sys.argv[0]] + remaining
+    main()